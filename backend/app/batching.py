@@ -0,0 +1,76 @@
+import asyncio
+
+
+class MicroBatcher:
+    # Eşzamanlı tek satırlık tahmin isteklerini en fazla max_wait saniye biriktirip
+    # tek bir predict_proba çağrısında birleştirir ve sonuçları bekleyen isteklere dağıtır.
+    # Tüm durum olay döngüsü iş parçacığında değiştirildiği için kilit gerekmez.
+    def __init__(self, executor, max_size=32, max_wait=0.002):
+        self.executor = executor
+        self.max_size = max(1, max_size)
+        self.max_wait = max_wait
+        self._queue = []
+        self._timer = None
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, current, columns):
+        # columns kanonik sütun demeti olmalı (aynı kümeler toplu iş içinde bir kez hesaplanır)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((current, columns, future))
+        if len(self._queue) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        queue, self._queue = self._queue, []
+
+        # Yeniden yükleme sırasında kuyrukta iki farklı paket olabilir; her paket ayrı toplu iş
+        groups = {}
+        for current, columns, future in queue:
+            rows = groups.setdefault(id(current), (current, {}))[1]
+            rows.setdefault(columns, []).append(future)
+
+        for current, rows in groups.values():
+            try:
+                batch = self.executor.submit(current, list(rows))
+            except Exception as e:
+                # Aşırı yük, çöken havuz veya kapatılmış havuz: bekleyen istekler askıda kalmaz, hatayı alır
+                self._fail(rows, e)
+                continue
+            self.batches += 1
+            self.rows += len(rows)
+            batch.add_done_callback(lambda done, rows=rows: self._fan_out(done, rows))
+
+    def _fan_out(self, batch, rows):
+        if batch.cancelled() or batch.exception() is not None:
+            self._fail(rows, batch.exception() if not batch.cancelled() else asyncio.CancelledError())
+            return
+        for probabilities, futures in zip(batch.result(), rows.values()):
+            for future in futures:
+                # İstemci bağlantıyı kestiyse future iptal edilmiş olabilir
+                if not future.done():
+                    future.set_result(probabilities)
+
+    @staticmethod
+    def _fail(rows, error):
+        for futures in rows.values():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+
+    def stats(self):
+        return {
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queued": len(self._queue),
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from . import config, metrics
+from .compact import load_compact
+from .encoder import SymptomEncoder
+from .forest import FlatForest
+from .guidance import DiseaseSymptomMatrix
+from .metadata import DiseaseStore
+from .search import SymptomIndex
+from .utils import current_rss_bytes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Yanıttaki en iyi tahmin sayısı ve listeye girmek için en düşük olasılık (API ve score.py ortak)
+TOP_PREDICTIONS = 5
+TOP_PREDICTION_MIN = 0.01
+
+
+class ModelBundle:
+    # Bir artefakt kümesinden türetilen her şey. Yüklendikten sonra değiştirilmez;
+    # yeniden yüklemede yeni bir paket oluşturulur ve tek bir atama ile değiştirilir.
+    def __init__(self, model, version, engine, encoder, disease_store, symptom_map, sources, guidance=None):
+        self.model = model
+        self.version = version
+        self.engine = engine
+        self.encoder = encoder
+        self.disease_store = disease_store
+        self.symptom_map = symptom_map
+        self.sources = sources
+        # Hastalık × semptom frekansları (model sınıf/semptom sırasında); eski artefaktlarda None
+        self.guidance = guidance
+        self.loaded_at = time.time()
+
+        # /symptoms kataloğunu bir kez oluştur ve JSON baytları olarak sakla
+        catalogue = _symptom_catalogue(encoder.symptoms, symptom_map)
+        # Frontend { symptoms: [...] } bekliyor
+        self.symptoms_payload = json.dumps(
+            {"symptoms": catalogue},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self.symptoms_etag = '"' + hashlib.sha256(self.symptoms_payload).hexdigest()[:32] + '"'
+
+        # /symptoms/search için Türkçe duyarlı önek dizini
+        self.symptom_index = SymptomIndex((item["label"], item["value"]) for item in catalogue)
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+    def format_prediction(self, probabilities):
+        # Tahmin, predict_proba çıktısının argmax'ı (RandomForest.predict ile aynı)
+        class_index = int(np.argmax(probabilities))
+        info = self.disease_store.at(class_index)
+
+        # En iyi 5 tahmini al (olasılığa göre azalan, eşitlikte sınıf sırası korunur)
+        top_indices = np.argsort(-probabilities, kind="stable")[:TOP_PREDICTIONS]
+
+        return {
+            "disease": info["name"],
+            "confidence": float(probabilities[class_index]),
+            "description": info["description"],
+            "precautions": list(info["precautions"]),
+            "top_predictions": self.top_predictions(probabilities, top_indices)
+        }
+
+    def top_predictions(self, probabilities, top_indices):
+        # Frontend için en iyi tahminleri biçimlendir (Türkçe adlar depodan); score.py de aynı listeyi yazar
+        return [
+            {"name": self.disease_store.at(idx)["name"], "value": float(probabilities[idx])}
+            for idx in top_indices
+            if probabilities[idx] > TOP_PREDICTION_MIN # Sadece %1'den büyükse dahil et
+        ]
+
+    def next_symptoms(self, probabilities, columns, limit=5, weighting=None, absent_columns=()):
+        # Sorulmamış semptomları mevcut olasılık dağılımı üzerindeki beklenen bilgi kazancına göre sırala
+        entropy, ranked = self.guidance.rank(probabilities, columns, limit, weighting, absent_columns)
+        symptoms = self.encoder.symptoms
+        candidates = []
+        for item in ranked:
+            sym = symptoms[item.pop("column")]
+            candidates.append(dict(label=self.symptom_map.get(sym, sym.replace('_', ' ').title()), value=sym, **item))
+        return entropy, candidates
+
+    def info(self):
+        return {
+            "version": self.version,
+            "engine": self.engine,
+            "loaded_at": self.loaded_at,
+            "n_classes": len(self.model.classes_),
+            "n_features": self.encoder.n_features,
+            "guidance": self.guidance is not None,
+        }
+
+    def stat_sources(self):
+        # İzlenen artefakt dosyalarının güncel durumu (dosya izleme modu self.sources ile karşılaştırır)
+        return _stat_sources(self.sources)
+
+
+def _file_version(path):
+    # Artefakt içeriğinin kısa özeti; önbellek anahtarlarını model sürümüne bağlar
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _mmap_snapshot(path, snapshot_dir, keep=3):
+    # Bellek eşlemesi için içerikle adlandırılmış özel kopya; döner: (kopya yolu, sürüm).
+    # Eşlenen dosya hiçbir zaman yerinde değişmez: models/ altındaki dosyanın `cp` ile üzerine yazılması
+    # eşleyen çalışanları SIGBUS ile düşürmez. Aynı sürümü yükleyen çalışanlar aynı kopyayı paylaşır.
+    import shutil
+    import tempfile
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    name, ext = os.path.splitext(os.path.basename(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{name}-", suffix=".tmp", dir=snapshot_dir)
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(path, 'rb') as src:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        # Sürüm kopyanın özetidir: kopyalama sırasında kaynak değişse bile ad ve içerik tutarlı
+        version = _file_version(tmp_path)
+        snapshot_path = os.path.join(snapshot_dir, f"{name}-{version}{ext}")
+        if os.path.exists(snapshot_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.utime(snapshot_path)
+
+    # Eski kopyaları temizle (en yeni `keep` tanesi kalır); hâlâ eşlenmiş bir dosyanın silinmesi
+    # onu kullanan süreçleri etkilemez, sayfalar eşleme kapanana kadar korunur
+    prefix = f"{name}-"
+    old = sorted(
+        (entry for entry in os.scandir(snapshot_dir) if entry.name.startswith(prefix) and entry.name.endswith(ext)),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in old[keep:]:
+        if entry.path != snapshot_path:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+    return snapshot_path, version
+
+
+def _stat_sources(paths):
+    sources = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            sources[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            sources[path] = None
+    return sources
+
+
+def _symptom_catalogue(symptoms, labels):
+    # Format: [{ "label": "Karın Ağrısı", "value": "stomach_pain" }, ...]
+    formatted_symptoms = []
+    for sym in symptoms:
+        # Haritadan Türkçe etiketi al, yoksa İngilizce başlık durumuna dön
+        label = labels.get(sym, sym.replace('_', ' ').title())
+        formatted_symptoms.append({
+            "label": label,
+            "value": sym
+        })
+
+    # Daha iyi kullanıcı deneyimi için Türkçe etikete göre sırala
+    formatted_symptoms.sort(key=lambda x: x['label'])
+    return formatted_symptoms
+
+
+def _load_guidance(path):
+    # İsteğe bağlı artefakt: yoksa veya okunamazsa /predict/next-symptom devre dışı kalır
+    if not os.path.exists(path):
+        return None
+    try:
+        return DiseaseSymptomMatrix.load(path)
+    except Exception as e:
+        print(f"Error loading disease-symptom matrix: {e}")
+        return None
+
+
+def _load_metadata(classes, map_path, d_map_path, desc_path, prec_path):
+    # Çeviri haritaları ve Türkçe CSV'ler; eksik dosyalar boş değerlerle tolere edilir
+    import pandas as pd
+
+    # 2. Semptom Haritasını Yükle (İngilizce -> Türkçe)
+    try:
+        with open(map_path, 'r', encoding='utf-8') as f:
+            symptom_map = json.load(f)
+    except Exception as e:
+        print(f"Error loading symptom map: {e}")
+        symptom_map = {}
+
+    # 3. Hastalık Haritasını Yükle (İngilizce -> Türkçe)
+    try:
+        with open(d_map_path, 'r', encoding='utf-8') as f:
+            disease_map = json.load(f)
+    except Exception as e:
+        print(f"Error loading disease map: {e}")
+        disease_map = {}
+
+    # 4. Türkçe Açıklamaları Yükle
+    description_df = None
+    try:
+        description_df = pd.read_csv(desc_path)
+        description_df['Disease'] = description_df['Disease'].str.strip()
+    except Exception as e:
+        print(f"Error loading descriptions: {e}")
+
+    # 5. Türkçe Önlemleri Yükle
+    precaution_df = None
+    try:
+        precaution_df = pd.read_csv(prec_path)
+        precaution_df['Disease'] = precaution_df['Disease'].str.strip()
+    except Exception as e:
+        print(f"Error loading precautions: {e}")
+
+    # 6. Her model sınıfı için çeviri, açıklama ve önlemleri önceden hesapla
+    disease_store = DiseaseStore(classes, disease_map, description_df, precaution_df)
+    return symptom_map, disease_store
+
+
+def load_bundle(base_dir=BASE_DIR, engine=None):
+    # Model yüklenemezse istisna fırlatır; çeviri/açıklama dosyaları eksikse boş değerlerle devam eder
+    engine = engine or config.INFERENCE_ENGINE
+    load_start = time.perf_counter()
+    timer = metrics.start_timer(metrics.LOAD_STAGE_DURATION, metrics.LOAD_DURATION)
+
+    models_dir = os.path.join(base_dir, 'models')
+    data_dir = os.path.join(base_dir, 'data')
+    map_path = os.path.join(data_dir, 'symptoms_tr_map.json')
+    d_map_path = os.path.join(data_dir, 'diseases_tr_map.json')
+    desc_path = os.path.join(data_dir, 'symptom_Description_TR.csv')
+    prec_path = os.path.join(data_dir, 'symptom_precaution_TR.csv')
+    guidance_path = os.path.join(models_dir, 'disease_symptom_matrix.npz')
+
+    metadata_files = [map_path, d_map_path, desc_path, prec_path, guidance_path]
+    if engine == "compact":
+        # Tek dosya: model, semptomlar, çeviriler, açıklamalar ve önlemler (python -m app.compact)
+        model_path = os.path.join(models_dir, 'medimind_bundle.npz')
+        model_files = [model_path]
+        metadata_files = []
+    elif engine == "flat":
+        model_path = os.path.join(models_dir, 'disease_forest.joblib')
+        model_files = [model_path]
+    else:
+        model_path = os.path.join(models_dir, 'disease_model.joblib')
+        symptoms_path = os.path.join(models_dir, 'symptoms_list.joblib')
+        model_files = [model_path, symptoms_path]
+
+    # Dosya durumlarını okumadan önce al: yükleme sırasında yazılan bir değişiklik izleme modunda kaçmaz
+    sources = _stat_sources(model_files + metadata_files)
+
+    # 1. Modeli ve Semptom Listesini Yükle
+    if engine == "compact":
+        # CSV/JSON ayrıştırma ve pandas yok; meta veriler paketle birlikte gelir
+        model, disease_store, symptom_map, guidance = load_compact(model_path)
+        unique_symptoms = model.feature_names
+    elif engine == "flat":
+        # Düzleştirilmiş orman kendi semptom sırasını taşır
+        if config.MODEL_MMAP:
+            snapshot_path, version = _mmap_snapshot(model_path, os.path.join(models_dir, '.snapshots'))
+            model = FlatForest.load(snapshot_path, mmap_mode='r')
+        else:
+            model = FlatForest.load(model_path)
+        unique_symptoms = model.feature_names
+    else:
+        import joblib
+
+        model = joblib.load(model_path)
+        unique_symptoms = joblib.load(symptoms_path)
+    if engine != "flat" or not config.MODEL_MMAP:
+        version = _file_version(model_path)
+    print(f"Model and symptoms loaded successfully (engine: {engine}, version: {version}).")
+    timer.mark("model")
+
+    # Semptom -> sütun indeksi kodlayıcısını bir kez oluştur
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        if list(feature_names) != list(unique_symptoms):
+            print("Warning: symptoms list does not match model features, using model feature order.")
+            unique_symptoms = list(feature_names)
+        # Sütun sırası doğrulandı; istek başına DataFrame oluşturmamak için
+        # model NumPy girdisini doğrudan kabul etsin
+        del model.feature_names_in_
+    encoder = SymptomEncoder(unique_symptoms)
+    timer.mark("encoder")
+
+    if engine != "compact":
+        symptom_map, disease_store = _load_metadata(model.classes_, map_path, d_map_path, desc_path, prec_path)
+        guidance = _load_guidance(guidance_path)
+    if guidance is not None:
+        try:
+            guidance = guidance.aligned(model.classes_, unique_symptoms)
+        except ValueError as e:
+            print(f"Warning: {e} Next-symptom guidance disabled; retrain the model.")
+            guidance = None
+    timer.mark("metadata")
+
+    bundle = ModelBundle(model, version, engine, encoder, disease_store, symptom_map, sources, guidance)
+    timer.mark("bundle")
+    timer.finish()
+
+    rss = current_rss_bytes()
+    rss_text = f"{rss / (1024 * 1024):.1f} MB" if rss is not None else "n/a"
+    print(f"Artifacts loaded in {(time.perf_counter() - load_start) * 1000:.1f} ms (RSS: {rss_text}).")
+    return bundle
+
+
+def validate_bundle(bundle):
+    # Yeni paketi trafiğe almadan önce örnek girdilerle doğrula; sorun varsa ValueError
+    n_classes = len(bundle.model.classes_)
+    n_features = getattr(bundle.model, 'n_features_in_', bundle.encoder.n_features)
+    if n_features != bundle.encoder.n_features:
+        raise ValueError(f"Model expects {n_features} features, vocabulary has {bundle.encoder.n_features}.")
+    if len(bundle.disease_store.by_index) != n_classes:
+        raise ValueError("Disease metadata does not cover every model class.")
+
+    # Boş küme, her semptom tek başına ve tüm semptomlar birlikte
+    probe = np.zeros((bundle.encoder.n_features + 2, bundle.encoder.n_features), dtype=np.float32)
+    probe[np.arange(1, bundle.encoder.n_features + 1), np.arange(bundle.encoder.n_features)] = 1
+    probe[-1] = 1
+    probabilities = bundle.predict_proba(probe)
+    if probabilities.shape != (probe.shape[0], n_classes):
+        raise ValueError(f"Unexpected probability shape {probabilities.shape}.")
+    if not np.all(np.isfinite(probabilities)) or not np.allclose(probabilities.sum(axis=1), 1.0):
+        raise ValueError("Model probabilities are not valid distributions.")
+    bundle.format_prediction(probabilities[0])
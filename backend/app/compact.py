@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+
+from .forest import FlatForest
+from .guidance import DiseaseSymptomMatrix
+from .metadata import DiseaseStore
+
+# Derlenmiş paket biçimi değiştiğinde artırılır; eski paketler yüklenmez, yeniden derlenmelidir
+FORMAT_VERSION = 1
+
+FOREST_PREFIX = "forest."
+GUIDANCE_PREFIX = "guidance."
+
+
+class StringTable:
+    # Tekilleştirilmiş UTF-8 metin tablosu: tüm metinler tek bir bayt dizisinde, uçları offsets'te
+    def __init__(self):
+        self._ids = {}
+        self._chunks = []
+
+    def add(self, text):
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._ids[text] = len(self._chunks)
+            self._chunks.append(text.encode("utf-8"))
+        return text_id
+
+    def arrays(self):
+        offsets = np.zeros(len(self._chunks) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in self._chunks], out=offsets[1:])
+        data = np.frombuffer(b"".join(self._chunks), dtype=np.uint8)
+        return data, offsets
+
+
+def _decode_strings(data, offsets):
+    raw = data.tobytes()
+    return [raw[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def save_compact(path, model, disease_store, symptom_map, source_version="", guidance=None):
+    # Düz orman + semptom etiketleri + sınıf başına ad/açıklama/önlemler (+ hastalık × semptom matrisi) tek bir .npz dosyasında
+    strings = StringTable()
+    missing = -1
+
+    symptom_labels = [strings.add(symptom_map[sym]) if sym in symptom_map else missing for sym in model.feature_names]
+
+    entries = disease_store.by_index
+    name_ids = [strings.add(info["name"]) for info in entries]
+    description_ids = [strings.add(info["description"]) for info in entries]
+    max_precautions = max([len(info["precautions"]) for info in entries] + [0])
+    precaution_ids = np.full((len(entries), max_precautions), missing, dtype=np.int32)
+    for row, info in enumerate(entries):
+        for col, precaution in enumerate(info["precautions"]):
+            precaution_ids[row, col] = strings.add(precaution)
+
+    data, offsets = strings.arrays()
+    arrays = {FOREST_PREFIX + name: np.ascontiguousarray(array) for name, array in model.arrays.items()}
+    arrays.update({
+        "format_version": np.asarray(FORMAT_VERSION, dtype=np.int32),
+        "source_version": np.asarray(source_version, dtype=str),
+        "strings": data,
+        "string_offsets": offsets,
+        "symptom_label_ids": np.asarray(symptom_labels, dtype=np.int32),
+        "disease_name_ids": np.asarray(name_ids, dtype=np.int32),
+        "description_ids": np.asarray(description_ids, dtype=np.int32),
+        "precaution_ids": precaution_ids,
+    })
+    if guidance is not None:
+        arrays.update({GUIDANCE_PREFIX + name: array for name, array in guidance.arrays().items()})
+
+    # Önce geçici dosyaya yaz: dosyayı izleyen sunucular yarım yazılmış paketi görmez
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_compact(path):
+    # Döner: (FlatForest, DiseaseStore, semptom etiketi haritası, DiseaseSymptomMatrix veya None).
+    # pickle, joblib ve pandas kullanılmaz.
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+
+    format_version = int(arrays["format_version"])
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f"Compact bundle format {format_version} is not supported (expected {FORMAT_VERSION}); rebuild it.")
+
+    model = FlatForest({
+        name[len(FOREST_PREFIX):]: array for name, array in arrays.items() if name.startswith(FOREST_PREFIX)
+    })
+    strings = _decode_strings(arrays["strings"], arrays["string_offsets"])
+
+    symptom_map = {
+        sym: strings[label_id]
+        for sym, label_id in zip(model.feature_names, arrays["symptom_label_ids"].tolist())
+        if label_id >= 0
+    }
+    disease_store = DiseaseStore.from_entries(
+        [str(disease) for disease in model.classes_],
+        [strings[i] for i in arrays["disease_name_ids"].tolist()],
+        [strings[i] for i in arrays["description_ids"].tolist()],
+        [[strings[i] for i in row if i >= 0] for row in arrays["precaution_ids"].tolist()],
+    )
+    guidance_arrays = {
+        name[len(GUIDANCE_PREFIX):]: array for name, array in arrays.items() if name.startswith(GUIDANCE_PREFIX)
+    }
+    guidance = DiseaseSymptomMatrix.from_arrays(guidance_arrays) if guidance_arrays else None
+    return model, disease_store, symptom_map, guidance
+
+
+def build_compact(base_dir=None, output_path=None):
+    # Düz ormanı ve çeviri/açıklama dosyalarını API'nin normal yükleme yoluyla oku, tek pakete derle
+    from .bundle import BASE_DIR, load_bundle
+
+    base_dir = base_dir or BASE_DIR
+    output_path = output_path or os.path.join(base_dir, 'models', 'medimind_bundle.npz')
+    bundle = load_bundle(base_dir, engine="flat")
+    save_compact(output_path, bundle.model, bundle.disease_store, bundle.symptom_map, source_version=bundle.version,
+                 guidance=bundle.guidance)
+    return output_path
+
+
+if __name__ == "__main__":
+    path = build_compact()
+    print(f"Compact bundle saved to {path} ({os.path.getsize(path) / 1024:.1f} KB)")
@@ -0,0 +1,64 @@
+import os
+
+# Ortam değişkenleriyle yapılandırılabilen sunucu ayarları
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default).strip().lower()
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"Invalid value for {name}, using default {default}.")
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        print(f"Invalid value for {name}, using default {default}.")
+        return default
+
+
+# Çıkarım motoru: "sklearn" (disease_model.joblib) veya "flat" (disease_forest.joblib)
+INFERENCE_ENGINE = _env_str("MEDIMIND_INFERENCE_ENGINE", "sklearn")
+
+# Düz orman dizilerini bellek eşlemeli (mmap) yükle; aynı düğümdeki çalışanlar sayfaları paylaşır.
+# Eşlenen dosya models/.snapshots altındaki sürüm adlı özel kopyadır, yerinde üzerine yazma çalışanları düşürmez.
+# sklearn modeli ağaç dizilerini yüklerken kopyaladığı için yalnızca "flat" motoru etkilenir.
+MODEL_MMAP = _env_bool("MEDIMIND_MODEL_MMAP", True)
+
+# Yönetim uç noktaları (/admin/reload) için paylaşılan anahtar; boşsa yönetim API'si kapalı
+ADMIN_TOKEN = os.environ.get("MEDIMIND_ADMIN_TOKEN", "")
+
+# Artefakt dosyalarını saniyede bir kontrol edip değişince yeniden yükle (0 = kapalı)
+WATCH_INTERVAL = _env_float("MEDIMIND_WATCH_INTERVAL", 0)
+
+# Tahmin sonucu önbelleği: en fazla kayıt sayısı (0 = kapalı) ve saniye cinsinden ömür (0 = süresiz)
+CACHE_SIZE = _env_int("MEDIMIND_CACHE_SIZE", 1024)
+CACHE_TTL = _env_float("MEDIMIND_CACHE_TTL", 0)
+
+# Çıkarım havuzu: "thread" veya "process", çalışan sayısı (0 = çekirdek sayısı) ve
+# kabul kuyruğu sınırı (çalışan + bekleyen iş; 0 = sınırsız). Kuyruk doluysa 503 + Retry-After döner.
+INFERENCE_EXECUTOR = _env_str("MEDIMIND_INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = _env_int("MEDIMIND_INFERENCE_WORKERS", 0)
+INFERENCE_MAX_PENDING = _env_int("MEDIMIND_INFERENCE_MAX_PENDING", 64)
+INFERENCE_RETRY_AFTER = _env_int("MEDIMIND_INFERENCE_RETRY_AFTER", 1)
+
+# Mikro toplu işleme: en fazla toplu iş boyutu (0 veya 1 = kapalı) ve milisaniye cinsinden en uzun bekleme
+BATCH_MAX_SIZE = _env_int("MEDIMIND_BATCH_MAX_SIZE", 0)
+BATCH_MAX_WAIT_MS = _env_float("MEDIMIND_BATCH_MAX_WAIT_MS", 2)
+
+# Aşama süreleri ve istek sayaçları (/metrics, Prometheus biçimi) ve isteğe bağlı Server-Timing yanıt başlığı
+METRICS_ENABLED = _env_bool("MEDIMIND_METRICS", True)
+SERVER_TIMING = _env_bool("MEDIMIND_SERVER_TIMING", False)
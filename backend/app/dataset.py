@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+# İşlenmiş eğitim verisi (.npz) biçim sürümü
+FORMAT_VERSION = 1
+
+
+def save_processed(path, X, labels, symptoms):
+    # İkili semptom matrisini CSR olarak (yalnızca indptr + indices; tüm değerler 1),
+    # etiketleri sınıf kodları olarak ve semptom sözlüğünü birlikte sakla
+    X = X.tocsr()
+    X.sort_indices()
+    classes, label_codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    arrays = {
+        "format_version": np.asarray(FORMAT_VERSION, dtype=np.int32),
+        "shape": np.asarray(X.shape, dtype=np.int64),
+        "indptr": X.indptr.astype(np.int64),
+        "indices": X.indices.astype(np.int32),
+        "label_codes": label_codes.reshape(-1).astype(np.int32),
+        "classes": classes,
+        "symptoms": np.asarray(symptoms, dtype=str),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_processed(path):
+    # Döner: (CSR float32 matris, etiket dizisi, semptom listesi); train_model.py doğrudan kullanır
+    from scipy import sparse
+
+    with np.load(path, allow_pickle=False) as npz:
+        format_version = int(npz["format_version"])
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Processed data format {format_version} is not supported (expected {FORMAT_VERSION}).")
+        indptr = npz["indptr"]
+        indices = npz["indices"]
+        shape = tuple(int(n) for n in npz["shape"])
+        X = sparse.csr_matrix((np.ones(indices.size, dtype=np.float32), indices, indptr), shape=shape)
+        # Etiketler veri setindeki gibi Python str (object) dizisi olarak döner
+        labels = npz["classes"].astype(object)[npz["label_codes"]]
+        symptoms = [str(sym) for sym in npz["symptoms"]]
+    return X, labels, symptoms
+
+
+def _write_member(archive, name, array):
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+        np.lib.format.write_array(f, np.asarray(array), allow_pickle=False)
+
+
+def _copy_member(archive, name, source_path, dtype, transform=None, block=1 << 20):
+    # Geçici ham dosyayı .npy üyesi olarak blok blok kopyala (tüm dizi belleğe alınmaz)
+    dtype = np.dtype(dtype)
+    count = os.path.getsize(source_path) // dtype.itemsize
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)}
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as f, open(source_path, "rb") as source:
+        np.lib.format.write_array_header_2_0(f, header)
+        while True:
+            values = np.fromfile(source, dtype=dtype, count=block)
+            if values.size == 0:
+                break
+            if transform is not None:
+                values = transform(values).astype(dtype, copy=False)
+            f.write(values.tobytes())
+
+
+class ProcessedWriter:
+    # save_processed ile aynı .npz dosyasını satır blokları eklenerek yazar.
+    # Bloklar önce geçici ham dosyalara eklenir, kapanışta arşive akıtılır; bellek kullanımı blok boyutuyla sınırlı.
+    def __init__(self, path, symptoms):
+        self.path = path
+        self.symptoms = list(symptoms)
+        self.n_rows = 0
+        self.nnz = 0
+        self._label_codes = {}
+        self._tmp_dir = tempfile.mkdtemp(prefix=".processed-", dir=os.path.dirname(os.path.abspath(path)))
+        self._indptr = open(os.path.join(self._tmp_dir, "indptr.bin"), "wb")
+        self._indices = open(os.path.join(self._tmp_dir, "indices.bin"), "wb")
+        self._labels = open(os.path.join(self._tmp_dir, "labels.bin"), "wb")
+        np.zeros(1, dtype=np.int64).tofile(self._indptr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Hata veya kesintide yarım çıktı bırakma
+            self._cleanup()
+
+    def append(self, X, labels):
+        X = X.tocsr()
+        X.sort_indices()
+        (X.indptr[1:].astype(np.int64) + self.nnz).tofile(self._indptr)
+        X.indices.astype(np.int32).tofile(self._indices)
+        # Sınıf kodları ilk görülme sırasıyla verilir, kapanışta sıralı sınıf tablosuna göre yeniden numaralanır
+        codes = [self._label_codes.setdefault(str(label), len(self._label_codes)) for label in labels]
+        np.asarray(codes, dtype=np.int32).tofile(self._labels)
+        self.n_rows += X.shape[0]
+        self.nnz += X.nnz
+
+    def close(self):
+        for f in (self._indptr, self._indices, self._labels):
+            f.close()
+        try:
+            classes = np.asarray(sorted(self._label_codes), dtype=str)
+            remap = np.empty(len(self._label_codes), dtype=np.int32)
+            for label, code in self._label_codes.items():
+                remap[code] = np.searchsorted(classes, label)
+
+            tmp_path = f"{self.path}.tmp"
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                _write_member(archive, "format_version", np.asarray(FORMAT_VERSION, dtype=np.int32))
+                _write_member(archive, "shape", np.asarray((self.n_rows, len(self.symptoms)), dtype=np.int64))
+                _copy_member(archive, "indptr", os.path.join(self._tmp_dir, "indptr.bin"), np.int64)
+                _copy_member(archive, "indices", os.path.join(self._tmp_dir, "indices.bin"), np.int32)
+                _copy_member(archive, "label_codes", os.path.join(self._tmp_dir, "labels.bin"), np.int32,
+                             transform=lambda codes: remap[codes])
+                _write_member(archive, "classes", classes)
+                _write_member(archive, "symptoms", np.asarray(self.symptoms, dtype=str))
+            os.replace(tmp_path, self.path)
+        finally:
+            self._cleanup()
+
+    def _cleanup(self):
+        for f in (self._indptr, self._indices, self._labels):
+            f.close()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
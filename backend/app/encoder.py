@@ -0,0 +1,109 @@
+import threading
+
+import numpy as np
+
+from .utils import clean_symptom
+
+
+def _clean_cells(values):
+    # Ham veri seti hücrelerini eğitimdeki gibi temizle: boşlukları kırp, '_' -> ' '
+    import pandas as pd
+
+    cells = pd.Series(np.asarray(values, dtype=object).ravel())
+    return cells.str.strip().str.replace('_', ' ')
+
+
+class SymptomEncoder:
+    # Semptom adlarını model sütun indekslerine eşleyen, bir kez oluşturulan kodlayıcı
+    def __init__(self, symptoms):
+        self.symptoms = list(symptoms)
+        self.index = {sym: i for i, sym in enumerate(self.symptoms)}
+        self.n_features = len(self.symptoms)
+        self._local = threading.local()
+
+    @classmethod
+    def from_records(cls, values):
+        # Semptom hücreleri matrisinden (satır = kayıt) sıralı sözlüğü oluştur
+        return cls(sorted(_clean_cells(values).dropna().unique()))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        # from_records ile aynı sözlük, ancak kayıtlar blok blok okunur (bellek blok boyutuyla sınırlı)
+        symptoms = set()
+        for values in chunks:
+            symptoms.update(_clean_cells(values).dropna().unique())
+        return cls(sorted(symptoms))
+
+    def _buffer(self):
+        # Her iş parçacığı kendi önceden ayrılmış satır tamponunu kullanır
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = np.zeros((1, self.n_features), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer
+
+    def lookup(self, symptoms):
+        # Bilinen semptomların sütun indekslerini ve bilinmeyen semptomları döndür
+        columns = []
+        unknown = []
+        for symptom in symptoms:
+            column = self.index.get(symptom)
+            if column is None:
+                # "stomach_pain" gibi ham veri seti yazımlarını da kabul et
+                column = self.index.get(clean_symptom(symptom))
+            if column is None:
+                unknown.append(symptom)
+            else:
+                columns.append(column)
+        return columns, unknown
+
+    @staticmethod
+    def canonical(columns):
+        # Sıralı ve tekrarsız sütun kümesi: aynı semptom kümesinin tüm yazımları için aynı anahtar
+        return tuple(sorted(set(columns)))
+
+    def encode(self, symptoms):
+        columns, unknown = self.lookup(symptoms)
+        return self.encode_columns(columns), unknown
+
+    def encode_columns(self, columns):
+        # Dönen satır bir sonraki çağrıda (aynı iş parçacığında) yeniden yazılır
+        row = self._buffer()
+        row.fill(0)
+        row[0, list(columns)] = 1
+        return row
+
+    def encode_batch(self, symptom_sets):
+        lookups = [self.lookup(symptoms) for symptoms in symptom_sets]
+        X = self.encode_column_sets([columns for columns, _ in lookups])
+        return X, [unknown for _, unknown in lookups]
+
+    def encode_column_sets(self, column_sets):
+        X = np.zeros((len(column_sets), self.n_features), dtype=np.float32)
+        for row, columns in enumerate(column_sets):
+            X[row, list(columns)] = 1
+        return X
+
+    def transform_records(self, values):
+        # Semptom hücreleri matrisini tek geçişte seyrek CSR ikili matrise kodla.
+        # Eğitim, ön işleme ve toplu puanlama aynı yolu kullanır.
+        import pandas as pd
+        from scipy import sparse
+
+        values = np.asarray(values, dtype=object)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        n_rows, n_cols = values.shape
+
+        # Sözlükte olmayan (veya boş) hücreler -1 kodunu alır ve atlanır
+        codes = pd.Categorical(_clean_cells(values), categories=self.symptoms).codes
+        present = codes >= 0
+        rows = np.repeat(np.arange(n_rows), n_cols)[present]
+        X = sparse.csr_matrix(
+            (np.ones(rows.size, dtype=np.float32), (rows, codes[present])),
+            shape=(n_rows, self.n_features),
+        )
+        # Aynı satırda tekrarlanan semptomlar toplanmak yerine 1 olarak kalır
+        X.sum_duplicates()
+        X.data[:] = 1
+        return X
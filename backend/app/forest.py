@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+
+
+def _leaf_ranges(children_left, children_right):
+    # Yaprakları soldan sağa numaralandır; her düğüm için alt ağacının [ilk, son) yaprak aralığı
+    n_nodes = len(children_left)
+    first = np.zeros(n_nodes, dtype=np.int64)
+    end = np.zeros(n_nodes, dtype=np.int64)
+    leaves = []
+    stack = [(0, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_left[node] == -1:
+            first[node] = len(leaves)
+            leaves.append(node)
+            end[node] = len(leaves)
+        elif children_done:
+            first[node] = first[children_left[node]]
+            end[node] = end[children_right[node]]
+        else:
+            stack.append((node, True))
+            stack.append((children_right[node], False))
+            stack.append((children_left[node], False))
+    return np.asarray(leaves, dtype=np.int64), first, end
+
+
+def flatten_forest(clf, feature_names):
+    # Eğitilmiş RandomForestClassifier ağaçlarını bitişik NumPy dizilerine dönüştür
+    node_feature, node_lo, node_hi = [], [], []
+    tree_leaf_start, leaf_values = [], []
+    n_leaves = 0
+
+    for estimator in clf.estimators_:
+        tree = estimator.tree_
+        left, right = tree.children_left, tree.children_right
+        internal = left != -1
+        thresholds = tree.threshold[internal]
+        if np.any((thresholds < 0) | (thresholds >= 1)):
+            raise ValueError("Forest has split thresholds outside [0, 1); inputs are not binary.")
+
+        leaves, first, end = _leaf_ranges(left, right)
+
+        # x[f] = 1 olduğunda düğüm sağa gider ve sol alt ağacının yapraklarını eler
+        left_children = left[internal]
+        node_feature.append(tree.feature[internal])
+        node_lo.append(first[left_children] + n_leaves)
+        node_hi.append(end[left_children] + n_leaves)
+
+        # Yaprak olasılıkları, DecisionTreeClassifier.predict_proba ile aynı normalizasyon
+        values = tree.value[leaves, 0, :]
+        normalizer = values.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        leaf_values.append(values / normalizer)
+
+        tree_leaf_start.append(n_leaves)
+        n_leaves += len(leaves)
+
+    node_feature = np.concatenate(node_feature)
+    node_lo = np.concatenate(node_lo)
+    node_hi = np.concatenate(node_hi)
+
+    # Düğümleri özelliğe göre grupla: bir özelliğin düğümleri feature_ptr[f]:feature_ptr[f + 1]
+    order = np.argsort(node_feature, kind="stable")
+    feature_ptr = np.zeros(len(feature_names) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(node_feature, minlength=len(feature_names)), out=feature_ptr[1:])
+
+    # Yaprak dağılımlarının çoğu aynı (saf yapraklar); benzersiz satırları bir kez sakla
+    values, leaf_value_index = np.unique(np.concatenate(leaf_values), axis=0, return_inverse=True)
+
+    return FlatForest({
+        # Sabit genişlikli unicode dizileri (object değil) bellek eşlemeli yüklenebilir
+        "classes": np.asarray(clf.classes_, dtype=str),
+        "feature_names": np.asarray(feature_names, dtype=str),
+        "feature_ptr": feature_ptr,
+        "node_lo": node_lo[order].astype(np.int32),
+        "node_hi": node_hi[order].astype(np.int32),
+        "tree_leaf_start": np.asarray(tree_leaf_start, dtype=np.int64),
+        "leaf_value_index": leaf_value_index.reshape(-1).astype(np.int32),
+        "values": values,
+    })
+
+
+class FlatForest:
+    # İkili (0/1) girdiler için düzleştirilmiş RandomForest değerlendiricisi.
+    # Her ağaçta, etkin özellikleri test eden düğümler sol alt ağaç yapraklarını eler;
+    # çıkış yaprağı, elenmeyen en soldaki yapraktır (QuickScorer yaklaşımı).
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.classes_ = arrays["classes"]
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.n_features_in_ = len(self.feature_names)
+        self.feature_ptr = arrays["feature_ptr"]
+        self.node_lo = arrays["node_lo"]
+        self.node_hi = arrays["node_hi"]
+        self.tree_leaf_start = arrays["tree_leaf_start"]
+        self.leaf_value_index = arrays["leaf_value_index"]
+        self.values = arrays["values"]
+        self.n_estimators = len(self.tree_leaf_start)
+        self.n_leaves = len(self.leaf_value_index)
+
+    def apply(self, X):
+        # Her satır ve ağaç için çıkış yaprağının numarası (tüm ormanda soldan sağa)
+        rows, features = X.nonzero()
+        n_rows = X.shape[0]
+        width = self.n_leaves + 1
+        tree_start = ((np.arange(n_rows) * width)[:, None] + self.tree_leaf_start).ravel()
+
+        # Etkin (satır, özellik) çiftlerinin düğüm listelerini tek bir indeks dizisinde birleştir
+        starts = self.feature_ptr[features]
+        counts = self.feature_ptr[features + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        nodes = offsets + np.arange(offsets.size)
+        if nodes.size == 0:
+            return tree_start.reshape(n_rows, -1) % width
+
+        # Elenen yaprak aralıklarını (satır başına kaydırılmış) sırala ve birleşik bloklara ayır
+        base = np.repeat(rows, counts) * width
+        lo = base + self.node_lo[nodes]
+        order = np.argsort(lo, kind="stable")
+        lo = lo[order]
+        reach = np.maximum.accumulate((base + self.node_hi[nodes])[order])
+        block_last = np.empty(lo.size, dtype=bool)
+        np.greater(lo[1:], reach[:-1], out=block_last[:-1])
+        block_last[-1] = True
+        block_end = reach[block_last]
+
+        # Ağacın ilk yaprağı elenmişse çıkış yaprağı, onu kapsayan bloğun hemen sonrasıdır
+        last = np.searchsorted(lo, tree_start, side="right") - 1
+        covered = (last >= 0) & (reach[last] > tree_start)
+        exits = block_end.take(np.searchsorted(block_end, tree_start, side="right"), mode="clip")
+        leaves = np.where(covered, exits, tree_start)
+        return leaves.reshape(n_rows, -1) % width
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Ağaç sırasıyla toplanır, ardından sklearn gibi ağaç sayısına bölünür
+        proba = self.values[self.leaf_value_index[leaves]].sum(axis=1)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def save(self, path):
+        # Sıkıştırmasız kaydet (mmap_mode ile yüklenebilsin). Önce geçici dosyaya yazılır:
+        # dosyayı bellek eşlemeli kullanan çalışan süreçler yerinde üzerine yazmadan etkilenmez.
+        import joblib
+
+        arrays = {name: np.ascontiguousarray(array) for name, array in self.arrays.items()}
+        tmp_path = f"{path}.tmp"
+        joblib.dump(arrays, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        # mmap_mode="r": diziler işletim sistemi sayfa önbelleği üzerinden süreçler arasında paylaşılır
+        import joblib
+
+        return cls(joblib.load(path, mmap_mode=mmap_mode))
+
+
+if __name__ == "__main__":
+    import joblib
+
+    # Mevcut bir disease_model.joblib dosyasını yeniden eğitmeden dışa aktar
+    models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+    clf = joblib.load(os.path.join(models_dir, 'disease_model.joblib'))
+    feature_names = getattr(clf, 'feature_names_in_', None)
+    if feature_names is None:
+        feature_names = joblib.load(os.path.join(models_dir, 'symptoms_list.joblib'))
+    forest_path = os.path.join(models_dir, 'disease_forest.joblib')
+    flatten_forest(clf, list(feature_names)).save(forest_path)
+    print(f"Flat forest saved to {forest_path}")
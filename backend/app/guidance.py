@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+
+from .utils import clean_symptom
+
+# Frekans tahmininde Laplace düzeltmesi: hiç görülmemiş semptom bir hastalığı tamamen elemez
+SMOOTHING = 1.0
+
+
+def _xlogx(values):
+    # 0 * log(0) = 0 kabulüyle eleman bazında x * log2(x)
+    out = np.zeros_like(values)
+    positive = values > 0
+    out[positive] = values[positive] * np.log2(values[positive])
+    return out
+
+
+def _match_key(name):
+    # Ağırlık dosyasındaki yazım farklarını yok say ("foul_smell_of urine", "dischromic _patches")
+    return "".join(clean_symptom(name).split())
+
+
+def load_severity(path, symptoms):
+    # Symptom-severity.csv: semptom başına 1-7 ağırlık; sözlükte eşleşmeyenler NaN
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    weights = {}
+    for name, weight in zip(df['Symptom'], df['weight']):
+        if isinstance(name, str):
+            weights.setdefault(_match_key(name), float(weight))
+    return np.asarray([weights.get(_match_key(sym), np.nan) for sym in symptoms], dtype=np.float32)
+
+
+class DiseaseSymptomMatrix:
+    # Hastalık × semptom eş görülme sayıları (eğitim verisinden) ve isteğe bağlı semptom şiddet ağırlıkları.
+    # Yönlendirmeli görüşmede "sıradaki en bilgilendirici semptom" sıralaması için kullanılır.
+    def __init__(self, classes, symptoms, counts, totals, severity=None):
+        self.classes = [str(c) for c in classes]
+        self.symptoms = [str(s) for s in symptoms]
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.totals = np.asarray(totals, dtype=np.float64)
+        self.severity = None if severity is None else np.asarray(severity, dtype=np.float32)
+
+        # P(semptom var | hastalık), satırlar sınıf, sütunlar semptom
+        self.frequency = (self.counts + SMOOTHING) / (self.totals[:, None] + 2 * SMOOTHING)
+
+        # Şiddet ağırlıkları [0, 1] aralığına; eksik ağırlıklar ortalama ile doldurulur
+        self.severity_weight = None
+        if self.severity is not None and np.any(np.isfinite(self.severity)):
+            weights = np.where(np.isfinite(self.severity), self.severity, np.nanmean(self.severity))
+            self.severity_weight = weights / weights.max()
+
+    @classmethod
+    def from_training(cls, X, y, symptoms, severity=None, sample_weight=None):
+        # X: ikili (seyrek) matris, y: satır etiketleri; sınıflar sklearn gibi sıralı
+        classes, codes = np.unique(np.asarray(y, dtype=str), return_inverse=True)
+        weights = np.ones(X.shape[0]) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        totals = np.bincount(codes.reshape(-1), weights=weights, minlength=len(classes))
+
+        # Sınıf göstergesi (C × N) ile çarpım: counts[c, s] = Σ ağırlık · X[n, s]
+        from scipy import sparse
+
+        indicator = sparse.csr_matrix(
+            (weights, (codes.reshape(-1), np.arange(X.shape[0]))), shape=(len(classes), X.shape[0]))
+        counts = np.asarray((indicator @ X).todense())
+        return cls(classes, symptoms, counts, totals, severity)
+
+    def arrays(self):
+        arrays = {
+            "classes": np.asarray(self.classes, dtype=str),
+            "symptoms": np.asarray(self.symptoms, dtype=str),
+            "counts": self.counts.astype(np.float32),
+            "totals": self.totals.astype(np.float32),
+        }
+        if self.severity is not None:
+            arrays["severity"] = self.severity
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["classes"], arrays["symptoms"], arrays["counts"], arrays["totals"], arrays.get("severity"))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **self.arrays())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            return cls.from_arrays({name: npz[name] for name in npz.files})
+
+    def aligned(self, classes, symptoms):
+        # Model sınıf ve semptom sırasına göre yeniden düzenlenmiş kopya; eşleşmezse ValueError
+        class_index = {c: i for i, c in enumerate(self.classes)}
+        symptom_index = {s: i for i, s in enumerate(self.symptoms)}
+        try:
+            rows = [class_index[str(c)] for c in classes]
+            cols = [symptom_index[str(s)] for s in symptoms]
+        except KeyError as e:
+            raise ValueError(f"Disease-symptom matrix does not cover model label {e}.")
+        severity = None if self.severity is None else self.severity[cols]
+        return DiseaseSymptomMatrix(classes, symptoms, self.counts[np.ix_(rows, cols)], self.totals[rows], severity)
+
+    def rank(self, probabilities, asked_columns, limit=5, weighting=None, absent_columns=()):
+        # Sorulmamış her semptom için beklenen bilgi kazancı (bit):
+        # IG(s) = H(p) - [P(evet) H(p | evet) + P(hayır) H(p | hayır)], tüm semptomlar için tek matris işlemiyle
+        p = np.asarray(probabilities, dtype=np.float64)
+        # Model girdisi "sorulmadı" ile "yok" arasında ayrım yapmaz; reddedilen semptomlar dağılıma
+        # P(yok | hastalık) çarpanıyla eklenir
+        absent_columns = list(absent_columns)
+        if absent_columns:
+            p = p * np.prod(1.0 - self.frequency[:, absent_columns], axis=1)
+        p = p / p.sum()
+        yes = p[:, None] * self.frequency             # P(d, evet)
+        no = p[:, None] - yes                          # P(d, hayır)
+        p_yes = yes.sum(axis=0)
+        p_no = 1.0 - p_yes
+
+        entropy = -_xlogx(p).sum()
+        # P(evet) H(p | evet) = -Σ_d P(d, evet) log P(d, evet) + P(evet) log P(evet)
+        expected = (-_xlogx(yes).sum(axis=0) + _xlogx(p_yes)) + (-_xlogx(no).sum(axis=0) + _xlogx(p_no))
+        gain = np.maximum(entropy - expected, 0.0)
+
+        score = gain
+        if weighting == "severity" and self.severity_weight is not None:
+            score = gain * self.severity_weight
+
+        candidates = np.ones(len(self.symptoms), dtype=bool)
+        candidates[list(asked_columns)] = False
+        candidates[absent_columns] = False
+        indices = np.flatnonzero(candidates)
+        # Puana göre azalan; eşitlikte "evet" olasılığı yüksek olan (doğrulayıcı soru) önce
+        order = np.lexsort((-p_yes[indices], -score[indices]))[:limit]
+        return entropy, [
+            {
+                "column": int(i),
+                "information_gain": float(gain[i]),
+                "score": float(score[i]),
+                "p_yes": float(p_yes[i]),
+            }
+            for i in indices[order]
+        ]
@@ -0,0 +1,191 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .bundle import BASE_DIR, load_bundle
+
+
+class InferenceOverloaded(Exception):
+    # Kabul kuyruğu dolu; istemci Retry-After kadar bekleyip yeniden denemeli
+    pass
+
+
+class InferenceUnavailable(Exception):
+    # Geçici olarak hizmet verilemiyor (çöken çalışan süreci, çalışanın model sürümü farklı); yeniden denenebilir
+    pass
+
+
+def predict_column_sets(current, column_sets):
+    # Kodlama da çalışan iş parçacığında yapılır: encode_columns arabelleği iş parçacığına özeldir
+    # ve olay döngüsünde bir await boyunca paylaşılmamalıdır
+    encoder = current.encoder
+    if len(column_sets) == 1:
+        X = encoder.encode_columns(column_sets[0])
+    else:
+        X = encoder.encode_column_sets(column_sets)
+    return current.predict_proba(X)
+
+
+# Süreç havuzu çalışanlarının kendi model paketi (her çalışan artefaktları diskten yükler)
+_worker_bundle = None
+_worker_base_dir = BASE_DIR
+
+
+def _init_process_worker(base_dir, engine):
+    global _worker_bundle, _worker_base_dir
+    _worker_base_dir = base_dir
+    _worker_bundle = load_bundle(base_dir, engine)
+
+
+def _process_predict(version, column_sets):
+    # Ana süreç modeli yeniden yüklediyse çalışan da aynı sürüme geçer. Çalışanlar diskteki artefaktları okur:
+    # dosyalar kopyalanıp (geçici dosya + yeniden adlandırma önerilir) /admin/reload henüz çağrılmadıysa
+    # sürümler farklıdır ve istek yeniden denenebilir (503)
+    global _worker_bundle
+    if _worker_bundle.version != version:
+        _worker_bundle = load_bundle(_worker_base_dir, _worker_bundle.engine)
+        if _worker_bundle.version != version:
+            raise InferenceUnavailable(
+                f"Inference worker has model {_worker_bundle.version}, server has {version}; retry after reload"
+            )
+    return predict_column_sets(_worker_bundle, column_sets)
+
+
+def _worker_ready():
+    # Başlatıcı (artefakt yükleme) bittikten sonra çalışır; havuz ısıtma için boş iş
+    return _worker_bundle.version
+
+
+class InferenceExecutor:
+    # Çıkarıma ayrılmış sınırlı boyutlu havuz (iş parçacığı veya süreç) ve kabul kuyruğu.
+    # Çalışan + bekleyen iş sayısı max_pending'e ulaşınca yeni işler kuyruğa alınmaz, reddedilir.
+    def __init__(self, kind="thread", workers=None, max_pending=64, base_dir=BASE_DIR, engine=None):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.base_dir = base_dir
+        self.engine = engine
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    # spawn: çalışanlar sunucunun iş parçacıklarını (izleyici vb.) fork ile kopyalamaz
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_process_worker,
+                        initargs=(self.base_dir, self.engine),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+            return self._pool
+
+    def _admit(self):
+        with self._lock:
+            if self.max_pending > 0 and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise InferenceOverloaded()
+            self.pending += 1
+
+    def _release(self, future):
+        # İstemci bağlantıyı kesse bile yer, iş havuzda bittiğinde boşalır
+        with self._lock:
+            self.pending -= 1
+            if future is not None:
+                self.completed += 1
+
+    def _reset_pool(self, pool):
+        # Çöken süreç havuzunu bırak; bir sonraki iş yeni havuz oluşturur
+        # (aynı havuzdaki her başarısız iş buraya gelir; yalnızca ilki havuzu kapatır)
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("Inference pool broken (worker died), restarting.")
+        # Yeni havuzu arka planda ısıt: sonraki istek çalışan başlatma ve artefakt yükleme süresini beklemez
+        threading.Thread(target=self.warm_up, name="inference-warm-up", daemon=True).start()
+
+    def warm_up(self):
+        # Süreç havuzunu ve her çalışanın artefakt yüklemesini ilk istekten önce başlat (çalışan başına bir boş iş).
+        # Hata yalnızca yazdırılır; bozuk havuz ilk istekte yeniden kurulur.
+        if self.kind != "process":
+            return
+        start = time.perf_counter()
+        try:
+            pool = self._get_pool()
+            for future in [pool.submit(_worker_ready) for _ in range(self.workers)]:
+                future.result()
+        except Exception as e:
+            print(f"Inference pool warm-up failed: {e!r}")
+            return
+        print(f"Inference pool ready ({self.workers} workers, {(time.perf_counter() - start) * 1000:.0f} ms).")
+
+    def submit(self, current, column_sets):
+        # Olasılık matrisini döndüren asyncio future; kuyruk doluysa InferenceOverloaded,
+        # çalışan süreç çöktüyse InferenceUnavailable
+        self._admit()
+        pool = None
+        try:
+            pool = self._get_pool()
+            if self.kind == "process":
+                job = pool.submit(_process_predict, current.version, [tuple(c) for c in column_sets])
+            else:
+                job = pool.submit(predict_column_sets, current, column_sets)
+        except BrokenProcessPool:
+            self._release(None)
+            self._reset_pool(pool)
+            raise InferenceUnavailable("Inference worker crashed, pool restarted; retry")
+        except BaseException:
+            self._release(None)
+            raise
+
+        # Havuz hataları istemciye yeniden denenebilir hata olarak yansır; iptal iş havuzuna iletilir
+        future = Future()
+        future.add_done_callback(lambda done: job.cancel() if done.cancelled() else None)
+
+        def finish(job):
+            self._release(job)
+            if future.cancelled():
+                return
+            if job.cancelled():
+                future.cancel()
+            elif isinstance(job.exception(), BrokenProcessPool):
+                self._reset_pool(pool)
+                future.set_exception(InferenceUnavailable("Inference worker crashed, pool restarted; retry"))
+            elif job.exception() is not None:
+                future.set_exception(job.exception())
+            else:
+                future.set_result(job.result())
+
+        job.add_done_callback(finish)
+        return asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
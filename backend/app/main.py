@@ -1,12 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import joblib
-import pandas as pd
-import numpy as np
-import os
-import json
-from typing import List
+import hmac
+import threading
+import time
+from typing import List, Literal
+
+from . import config, metrics
+from .batching import MicroBatcher
+from .bundle import load_bundle, validate_bundle
+from .cache import LRUCache
+from .inference import InferenceExecutor, InferenceOverloaded, InferenceUnavailable
 
 app = FastAPI(title="MediMind AI API (Turkish)")
 
@@ -19,155 +24,365 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global değişkenler
-model = None
-unique_symptoms = None
-symptom_map = None
-disease_map = None
-description_df = None
-precaution_df = None
+# Etkin model paketi; yeniden yüklemede tek bir atama ile değiştirilir.
+# İstekler başta paketi yerel değişkene alır, böylece işlem sürerken değişiklikten etkilenmez.
+bundle = None
+reload_state = {"state": "idle", "error": None, "started_at": None, "finished_at": None}
+_reload_lock = threading.Lock()
+
+# Kanonik semptom kümesi -> biçimlendirilmiş tahmin (model sürümüne bağlı)
+prediction_cache = LRUCache(config.CACHE_SIZE, config.CACHE_TTL)
+
+# Tahminler ayrılmış, sınırlı bir havuzda çalışır; sunucu iş parçacıkları ve olay döngüsü bloke olmaz
+inference = InferenceExecutor(
+    config.INFERENCE_EXECUTOR,
+    config.INFERENCE_WORKERS,
+    config.INFERENCE_MAX_PENDING,
+)
+
+# İsteğe bağlı mikro toplu işleme: eşzamanlı /predict istekleri tek bir çıkarım çağrısında birleşir
+batcher = None
+if config.BATCH_MAX_SIZE > 1:
+    batcher = MicroBatcher(inference, config.BATCH_MAX_SIZE, config.BATCH_MAX_WAIT_MS / 1000)
+
+# /symptoms kataloğu yalnızca artefaktlar yeniden yüklendiğinde değişir
+SYMPTOMS_CACHE_CONTROL = "public, max-age=300"
+
+# /symptoms/search: varsayılan ve en fazla sonuç sayısı
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+# Tek bir toplu istekte kabul edilen en fazla semptom kümesi
+MAX_BATCH_SIZE = 1000
+
+# /predict/next-symptom: en fazla aday sayısı
+NEXT_SYMPTOM_MAX_LIMIT = 20
 
 class SymptomRequest(BaseModel):
     symptoms: List[str]
 
+class BatchSymptomRequest(BaseModel):
+    symptom_sets: List[List[str]]
+
+class NextSymptomRequest(BaseModel):
+    symptoms: List[str]
+    # Hastanın "yok" dediği semptomlar: bir daha önerilmez ve dağılım bunlara göre koşullanır
+    absent: List[str] = []
+    limit: int = 5
+    # "severity": bilgi kazancı Symptom-severity.csv ağırlıklarıyla çarpılır
+    weighting: Literal["none", "severity"] = "none"
+
 @app.on_event("startup")
 def load_artifacts():
-    global model, unique_symptoms, symptom_map, disease_map, description_df, precaution_df
-    
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    models_dir = os.path.join(base_dir, 'models')
-    data_dir = os.path.join(base_dir, 'data')
-    
-    # 1. Modeli ve Semptom Listesini Yükle
+    global bundle
     try:
-        model = joblib.load(os.path.join(models_dir, 'disease_model.joblib'))
-        unique_symptoms = joblib.load(os.path.join(models_dir, 'symptoms_list.joblib'))
-        print("Model and symptoms loaded successfully.")
+        bundle = load_bundle()
+        metrics.LOADS.inc("ok")
     except Exception as e:
+        metrics.LOADS.inc("failed")
         print(f"Error loading model: {e}")
 
-    # 2. Semptom Haritasını Yükle (İngilizce -> Türkçe)
-    try:
-        map_path = os.path.join(data_dir, 'symptoms_tr_map.json')
-        with open(map_path, 'r', encoding='utf-8') as f:
-            symptom_map = json.load(f)
-    except Exception as e:
-        print(f"Error loading symptom map: {e}")
-        symptom_map = {}
+    # Süreç havuzunda çalışanları ve artefakt yüklemelerini şimdi başlat; ilk /predict bunları beklemez
+    inference.warm_up()
 
-    # 3. Hastalık Haritasını Yükle (İngilizce -> Türkçe)
-    try:
-        d_map_path = os.path.join(data_dir, 'diseases_tr_map.json')
-        with open(d_map_path, 'r', encoding='utf-8') as f:
-            disease_map = json.load(f)
-    except Exception as e:
-        print(f"Error loading disease map: {e}")
-        disease_map = {}
+    if config.WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_artifacts, name="artifact-watcher", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_inference():
+    inference.shutdown()
 
-    # 4. Türkçe Açıklamaları Yükle
+def reload_artifacts():
+    # Yeni paketi arka planda yükle, doğrula ve etkin paketle değiştir.
+    # Başarısız olursa mevcut paket hizmet vermeye devam eder.
+    global bundle
+    if not _reload_lock.acquire(blocking=False):
+        return False
     try:
-        desc_path = os.path.join(data_dir, 'symptom_Description_TR.csv')
-        description_df = pd.read_csv(desc_path)
-        description_df['Disease'] = description_df['Disease'].str.strip()
-    except Exception as e:
-        print(f"Error loading descriptions: {e}")
+        reload_state.update(state="loading", error=None, started_at=time.time(), finished_at=None)
+        try:
+            new_bundle = load_bundle()
+            validate_bundle(new_bundle)
+        except Exception as e:
+            metrics.LOADS.inc("failed")
+            print(f"Reload failed, keeping current model: {e}")
+            reload_state.update(state="failed", error=str(e), finished_at=time.time())
+            return True
+
+        metrics.LOADS.inc("ok")
+        bundle = new_bundle
+        # Eski modelin önbelleğe alınmış sonuçlarını bırak
+        prediction_cache.clear()
+        reload_state.update(state="ok", finished_at=time.time())
+        print(f"Model reloaded (version: {new_bundle.version}).")
+        return True
+    finally:
+        _reload_lock.release()
+
+def _watch_artifacts():
+    # Başarısız bir denemeden sonra dosyalar tekrar değişene kadar yeniden deneme
+    last_attempt = None
+    while True:
+        time.sleep(config.WATCH_INTERVAL)
+        current = bundle
+        if current is None:
+            continue
+        sources = current.stat_sources()
+        if sources != current.sources and sources != last_attempt:
+            print("Artifact change detected, reloading...")
+            last_attempt = sources
+            reload_artifacts()
 
-    # 5. Türkçe Önlemleri Yükle
+def _require_admin(request):
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API disabled (set MEDIMIND_ADMIN_TOKEN)")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode(), config.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+async def _infer(current, column_sets):
+    # Kabul kuyruğu doluysa bekletmek yerine hemen reddet (öngörülebilir kuyruk gecikmesi)
     try:
-        prec_path = os.path.join(data_dir, 'symptom_precaution_TR.csv')
-        precaution_df = pd.read_csv(prec_path)
-        precaution_df['Disease'] = precaution_df['Disease'].str.strip()
-    except Exception as e:
-        print(f"Error loading precautions: {e}")
+        if batcher is not None and len(column_sets) == 1:
+            return [await batcher.predict(current, column_sets[0])]
+        return await inference.submit(current, column_sets)
+    except InferenceOverloaded:
+        raise HTTPException(
+            status_code=503,
+            detail="Inference queue is full, retry later",
+            headers={"Retry-After": str(config.INFERENCE_RETRY_AFTER)},
+        )
+    except InferenceUnavailable as e:
+        # Çöken çalışan (havuz yeniden kuruluyor) veya çalışanın model sürümü farklı: geçici durum
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(config.INFERENCE_RETRY_AFTER)},
+        )
+
+def _json_response(content, timer):
+    # Yanıt burada oluşturulur: serileştirme süresi ölçülür ve Server-Timing başlığı eklenebilir
+    response = JSONResponse(content)
+    timer.mark("serialize")
+    server_timing = timer.server_timing()
+    if server_timing:
+        response.headers["Server-Timing"] = server_timing
+    return response
+
+def _finish_request(endpoint, timer, status):
+    timer.finish()
+    if config.METRICS_ENABLED:
+        metrics.REQUESTS.inc(endpoint, str(status))
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Zayıf karşılaştırma (RFC 9110): W/ önekini yok say
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
 
 @app.get("/")
 def read_root():
     return {"message": "MediMind AI API is running (Turkish Mode)"}
 
 @app.get("/symptoms")
-def get_symptoms():
-    if unique_symptoms is None:
+def get_symptoms(request: Request):
+    current = bundle
+    if current is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    # Format: [{ "label": "Karın Ağrısı", "value": "stomach_pain" }, ...]
-    formatted_symptoms = []
-    for sym in unique_symptoms:
-        # Haritadan Türkçe etiketi al, yoksa İngilizce başlık durumuna dön
-        label = symptom_map.get(sym, sym.replace('_', ' ').title())
-        formatted_symptoms.append({
-            "label": label,
-            "value": sym
-        })
+    headers = {"ETag": current.symptoms_etag, "Cache-Control": SYMPTOMS_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), current.symptoms_etag):
+        return Response(status_code=304, headers=headers)
     
-    # Daha iyi kullanıcı deneyimi için Türkçe etikete göre sırala
-    formatted_symptoms.sort(key=lambda x: x['label'])
+    return Response(content=current.symptoms_payload, media_type="application/json", headers=headers)
+
+@app.get("/symptoms/search")
+def search_symptoms(q: str = "", limit: int = SEARCH_DEFAULT_LIMIT):
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
     
-    return {"symptoms": formatted_symptoms} # Frontend { symptoms: [...] } bekliyor
+    # Türkçe etiket veya İngilizce anahtarın başı ya da herhangi bir kelimesinin başı ile eşleşir
+    limit = max(0, min(limit, SEARCH_MAX_LIMIT))
+    return {"query": q, "results": current.symptom_index.search(q, limit)}
+
+@app.get("/model")
+def get_model_info():
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return dict(current.info(), reload=dict(reload_state), inference=inference.stats(),
+                batching=batcher.stats() if batcher is not None else None)
+
+@app.post("/admin/reload", status_code=202)
+def trigger_reload(request: Request):
+    _require_admin(request)
+    if _reload_lock.locked():
+        raise HTTPException(status_code=409, detail="Reload already in progress")
+    
+    threading.Thread(target=reload_artifacts, name="artifact-reload", daemon=True).start()
+    current = bundle
+    return {"status": "reloading", "current_version": current.version if current else None}
+
+@app.get("/metrics")
+def get_metrics():
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled (MEDIMIND_METRICS=0)")
+    
+    # Önbellek, çıkarım havuzu ve model bilgisi kazıma anında okunur
+    current = bundle
+    cache_stats = prediction_cache.stats()
+    inference_stats = inference.stats()
+    lines = []
+    lines += metrics.render_gauge("medimind_model_info", "Currently served model.", [
+        ((current.version, current.engine), 1)] if current else [], labelnames=("version", "engine"))
+    lines += metrics.render_gauge("medimind_cache_hits_total", "Prediction cache hits.", [((), cache_stats["hits"])], kind="counter")
+    lines += metrics.render_gauge("medimind_cache_misses_total", "Prediction cache misses.", [((), cache_stats["misses"])], kind="counter")
+    lines += metrics.render_gauge("medimind_cache_entries", "Entries in the prediction cache.", [((), cache_stats["size"])])
+    lines += metrics.render_gauge("medimind_inference_pending", "Inference jobs running or queued.", [((), inference_stats["pending"])])
+    lines += metrics.render_gauge("medimind_inference_rejected_total", "Inference jobs rejected because the queue was full.",
+                                  [((), inference_stats["rejected"])], kind="counter")
+    if batcher is not None:
+        batch_stats = batcher.stats()
+        lines += metrics.render_gauge("medimind_batches_total", "Micro-batches sent to the inference pool.", [((), batch_stats["batches"])], kind="counter")
+        lines += metrics.render_gauge("medimind_batched_rows_total", "Rows evaluated in micro-batches.", [((), batch_stats["rows"])], kind="counter")
+    
+    return Response(content=metrics.render(lines), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    current = bundle
+    return dict(prediction_cache.stats(), model_version=current.version if current else None)
 
 @app.post("/predict")
-def predict_disease(request: SymptomRequest):
-    if model is None or unique_symptoms is None:
+async def predict_disease(request: SymptomRequest):
+    timer = metrics.start_timer(metrics.STAGE_DURATION, metrics.REQUEST_DURATION, ("/predict",))
+    try:
+        response = _json_response(await _predict_single(request.symptoms, timer), timer)
+    except HTTPException as e:
+        _finish_request("/predict", timer, e.status_code)
+        raise
+    except Exception:
+        _finish_request("/predict", timer, 500)
+        raise
+    _finish_request("/predict", timer, 200)
+    return response
+
+async def _predict_single(symptoms, timer):
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    encoder = current.encoder
+    
+    # Semptomları sütun indekslerine çevir (sözlük araması, DataFrame yok)
+    columns, unknown_symptoms = encoder.lookup(symptoms)
+    timer.mark("lookup")
+    
+    # Aynı semptom kümesi daha önce görüldüyse çıkarımı tamamen atla
+    cache_key = (current.version, encoder.canonical(columns))
+    result = prediction_cache.get(cache_key)
+    timer.mark("cache")
+    if result is None:
+        # Tek bir predict_proba çağrısı hem tahmini hem de en iyi 5'i verir (kuyruk bekleme süresi dahil)
+        probabilities = (await _infer(current, [cache_key[1]]))[0]
+        timer.mark("inference")
+        result = current.format_prediction(probabilities)
+        prediction_cache.put(cache_key, result)
+        timer.mark("format")
+    
+    return dict(result, unknown_symptoms=unknown_symptoms)
+
+@app.post("/predict/batch")
+async def predict_disease_batch(request: BatchSymptomRequest):
+    timer = metrics.start_timer(metrics.STAGE_DURATION, metrics.REQUEST_DURATION, ("/predict/batch",))
+    try:
+        response = _json_response(await _predict_batch(request.symptom_sets, timer), timer)
+    except HTTPException as e:
+        _finish_request("/predict/batch", timer, e.status_code)
+        raise
+    except Exception:
+        _finish_request("/predict/batch", timer, 500)
+        raise
+    _finish_request("/predict/batch", timer, 200)
+    return response
+
+async def _predict_batch(symptom_sets, timer):
+    current = bundle
+    if current is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    encoder = current.encoder
+    
+    if len(symptom_sets) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch size exceeds {MAX_BATCH_SIZE}")
+    if not symptom_sets:
+        return {"results": []}
+    
+    lookups = [encoder.lookup(symptoms) for symptoms in symptom_sets]
+    keys = [(current.version, encoder.canonical(columns)) for columns, _ in lookups]
+    timer.mark("lookup")
+    results = [prediction_cache.get(key) for key in keys]
+    timer.mark("cache")
+    
+    # Önbellekte olmayan benzersiz kümeleri tek bir ikili matrise kodla (satır = küme, sütun = semptom)
+    pending = {}
+    for i, result in enumerate(results):
+        if result is None:
+            pending.setdefault(keys[i], []).append(i)
+    
+    if pending:
+        # Tüm eksikler için tek bir predict_proba çağrısı
+        probabilities = await _infer(current, [key[1] for key in pending])
+        timer.mark("inference")
+        for (key, indices), row in zip(pending.items(), probabilities):
+            result = current.format_prediction(row)
+            prediction_cache.put(key, result)
+            for i in indices:
+                results[i] = result
+        timer.mark("format")
+    
+    return {"results": [
+        dict(result, unknown_symptoms=unknown) for result, (_, unknown) in zip(results, lookups)
+    ]}
+
+@app.post("/predict/next-symptom")
+async def suggest_next_symptom(request: NextSymptomRequest):
+    timer = metrics.start_timer(metrics.STAGE_DURATION, metrics.REQUEST_DURATION, ("/predict/next-symptom",))
+    try:
+        response = _json_response(await _next_symptom(request, timer), timer)
+    except HTTPException as e:
+        _finish_request("/predict/next-symptom", timer, e.status_code)
+        raise
+    except Exception:
+        _finish_request("/predict/next-symptom", timer, 500)
+        raise
+    _finish_request("/predict/next-symptom", timer, 200)
+    return response
+
+async def _next_symptom(request, timer):
+    current = bundle
+    if current is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    if current.guidance is None:
+        raise HTTPException(status_code=503, detail="Symptom guidance not available (retrain the model)")
+    
+    columns, unknown_symptoms = current.encoder.lookup(request.symptoms)
+    absent_columns, unknown_absent = current.encoder.lookup(request.absent)
+    unknown_symptoms = unknown_symptoms + unknown_absent
+    timer.mark("lookup")
+    
+    # Mevcut semptomlarla olasılık dağılımı, ardından tüm adaylar için tek matris işlemi
+    probabilities = (await _infer(current, [current.encoder.canonical(columns)]))[0]
+    timer.mark("inference")
+    limit = max(0, min(request.limit, NEXT_SYMPTOM_MAX_LIMIT))
+    entropy, candidates = current.next_symptoms(probabilities, columns, limit, request.weighting, absent_columns)
+    timer.mark("rank")
     
-    user_symptoms = request.symptoms
-    
-    # Eğitim özellik adlarıyla eşleşmesi için giriş vektörünü DataFrame olarak oluştur
-    input_vector = pd.DataFrame(0, index=[0], columns=unique_symptoms)
-    
-    # Mevcut semptomlar için 1 ayarla
-    for symptom in user_symptoms:
-        if symptom in unique_symptoms:
-            input_vector.loc[0, symptom] = 1
-            
-    # Predict
-    prediction = model.predict(input_vector)[0]
-    probabilities = model.predict_proba(input_vector)[0]
-    
-    # En iyi 5 tahmini al
-    class_probs = list(zip(model.classes_, probabilities))
-    # Olasılığa göre azalan sırada sırala
-    class_probs.sort(key=lambda x: x[1], reverse=True)
-    top_predictions = class_probs[:5]
-    
-    # Frontend için en iyi tahminleri biçimlendir
-    top_predictions_formatted = []
-    for disease, prob in top_predictions:
-        if prob > 0.01: # Sadece %1'den büyükse dahil et
-            # Hastalık adını çevir
-            tr_name = disease_map.get(disease, disease) if disease_map else disease
-            top_predictions_formatted.append({
-                "name": tr_name,
-                "value": float(prob)
-            })
-
-    # Güven skorunu al
-    class_index = list(model.classes_).index(prediction)
-    confidence = float(probabilities[class_index])
-    
-    # Türkçe Açıklamayı Al
-    description = "Tanım bulunamadı."
-    if description_df is not None:
-        desc_row = description_df[description_df['Disease'] == prediction]
-        if not desc_row.empty:
-            description = desc_row.iloc[0]['Description']
-            
-    # Türkçe Önlemleri Al
-    precautions = []
-    if precaution_df is not None:
-        prec_row = precaution_df[precaution_df['Disease'] == prediction]
-        if not prec_row.empty:
-            p_cols = [col for col in prec_row.columns if 'Precaution' in col]
-            precautions = [prec_row.iloc[0][col] for col in p_cols if pd.notna(prec_row.iloc[0][col]) and str(prec_row.iloc[0][col]).strip() != ""]
-            # Metinleri temizle
-            precautions = [str(p).strip().capitalize() for p in precautions]
-
-    # Ana tahmini çevir
-    prediction_tr = disease_map.get(prediction, prediction) if disease_map else prediction
-
-    return {
-        "disease": prediction_tr, 
-        "confidence": confidence,
-        "description": description,
-        "precautions": precautions,
-        "top_predictions": top_predictions_formatted
-    }
+    return {"entropy": entropy, "weighting": request.weighting, "candidates": candidates, "unknown_symptoms": unknown_symptoms}
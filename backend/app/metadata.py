@@ -0,0 +1,61 @@
+DEFAULT_DESCRIPTION = "Tanım bulunamadı."
+
+
+def _clean_precautions(values):
+    # Boş/NaN önlemleri at ve metinleri temizle
+    precautions = []
+    for value in values:
+        if value is None or value != value:  # NaN kontrolü
+            continue
+        text = str(value).strip()
+        if text != "":
+            precautions.append(text.capitalize())
+    return precautions
+
+
+class DiseaseStore:
+    # Model sınıfı başına önceden hesaplanmış Türkçe ad, açıklama ve önlemler
+    def __init__(self, classes, disease_map=None, description_df=None, precaution_df=None):
+        disease_map = disease_map or {}
+
+        # Veri setindeki ilk satır geçerli (eski .iloc[0] davranışı)
+        descriptions = {}
+        if description_df is not None:
+            for disease, description in zip(description_df['Disease'], description_df['Description']):
+                descriptions.setdefault(str(disease).strip(), description)
+
+        precautions = {}
+        if precaution_df is not None:
+            p_cols = [col for col in precaution_df.columns if 'Precaution' in col]
+            rows = zip(precaution_df['Disease'], *(precaution_df[col] for col in p_cols))
+            for disease, *values in rows:
+                precautions.setdefault(str(disease).strip(), _clean_precautions(values))
+
+        self.by_index = []
+        self.by_name = {}
+        for disease in classes:
+            # Veri setindeki bazı sınıf adlarının sonunda boşluk var ("Diabetes ")
+            key = str(disease).strip()
+            info = {
+                "name": disease_map.get(key, disease_map.get(disease, key)),
+                "description": descriptions.get(key, DEFAULT_DESCRIPTION),
+                "precautions": precautions.get(key, []),
+            }
+            self.by_index.append(info)
+            self.by_name[disease] = info
+
+    @classmethod
+    def from_entries(cls, classes, names, descriptions, precautions):
+        # Derlenmiş paketten (app.compact) yükleme: sınıf sırasıyla hizalı listeler, pandas gerektirmez
+        store = cls([])
+        for disease, name, description, disease_precautions in zip(classes, names, descriptions, precautions):
+            info = {"name": name, "description": description, "precautions": list(disease_precautions)}
+            store.by_index.append(info)
+            store.by_name[disease] = info
+        return store
+
+    def __getitem__(self, disease):
+        return self.by_name[disease]
+
+    def at(self, class_index):
+        return self.by_index[class_index]
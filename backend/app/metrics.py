@@ -0,0 +1,170 @@
+import threading
+import time
+from bisect import bisect_left
+
+from . import config
+
+# Saniye cinsinden histogram sınırları: önbellek isabetinden (µs) yavaş yüklemeye (s) kadar
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Etiket demeti -> [kova sayıları (kümülatif değil, son kova +Inf), toplam]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bucket_names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    label_text = _format_labels(bucket_names, labels + (_format_value(bound),))
+                    lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+                label_text = _format_labels(self.labelnames, labels)
+                lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+                lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+def render_gauge(name, documentation, samples, kind="gauge", labelnames=()):
+    # Kazıma anında hesaplanan değerler (önbellek, havuz istatistikleri); samples: [(etiketler, değer)]
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return lines
+
+
+class StageTimer:
+    # İstek veya yükleme içindeki aşama sürelerini ölçer; mark(stage) bir önceki işaretten bu yana geçen süreyi kaydeder
+    enabled = True
+
+    def __init__(self, stage_histogram, total_histogram, labels=(), record=True):
+        self.stage_histogram = stage_histogram
+        self.total_histogram = total_histogram
+        self.labels = labels
+        self.record = record
+        self.stages = []
+        self.start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def finish(self):
+        total = time.perf_counter() - self.start
+        if self.record:
+            for stage, duration in self.stages:
+                self.stage_histogram.observe(duration, *self.labels, stage)
+            self.total_histogram.observe(total, *self.labels)
+        return total
+
+    def server_timing(self):
+        # Server-Timing başlığı (milisaniye): tarayıcı geliştirici araçlarında aşama dökümü
+        if not config.SERVER_TIMING:
+            return None
+        parts = [f"{stage};dur={duration * 1000:.3f}" for stage, duration in self.stages]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.3f}")
+        return ", ".join(parts)
+
+
+class _NullTimer:
+    # Ölçüm kapalıyken kullanılan boş zamanlayıcı: her çağrı hiçbir şey yapmaz
+    enabled = False
+
+    def mark(self, stage):
+        pass
+
+    def finish(self):
+        return None
+
+    def server_timing(self):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def start_timer(stage_histogram, total_histogram, labels=()):
+    if not (config.METRICS_ENABLED or config.SERVER_TIMING):
+        return NULL_TIMER
+    return StageTimer(stage_histogram, total_histogram, labels, record=config.METRICS_ENABLED)
+
+
+# Tahmin uç noktaları
+REQUEST_DURATION = Histogram(
+    "medimind_request_duration_seconds", "End-to-end handler time of prediction requests.", ["endpoint"])
+STAGE_DURATION = Histogram(
+    "medimind_request_stage_seconds", "Time spent in each stage of a prediction request.", ["endpoint", "stage"])
+REQUESTS = Counter("medimind_requests_total", "Prediction requests by response status.", ["endpoint", "status"])
+
+# Artefakt yükleme (başlangıç ve yeniden yükleme)
+LOAD_DURATION = Histogram(
+    "medimind_artifact_load_seconds", "Total time to load a model bundle.", [])
+LOAD_STAGE_DURATION = Histogram(
+    "medimind_artifact_load_stage_seconds", "Time spent in each stage of loading a model bundle.", ["stage"])
+LOADS = Counter("medimind_artifact_loads_total", "Model bundle loads by result.", ["result"])
+
+REGISTRY = [REQUEST_DURATION, STAGE_DURATION, REQUESTS, LOAD_DURATION, LOAD_STAGE_DURATION, LOADS]
+
+
+def render(extra_lines=()):
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
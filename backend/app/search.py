@@ -0,0 +1,59 @@
+import unicodedata
+from bisect import bisect_left
+
+# Türkçe büyük/küçük harf dönüşümü: "I" -> "ı", "İ" -> "i" (str.lower bunları yanlış çevirir)
+_TURKISH_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+
+# Aksan duyarsız eşleşme: Türkçe harfler ASCII karşılıklarına indirgenir ("ağrı" == "agri")
+_ASCII_FOLD = str.maketrans({"ı": "i", "ş": "s", "ğ": "g", "ç": "c", "ö": "o", "ü": "u", "_": " "})
+
+# Eşleşme türleri (küçük olan önce sıralanır)
+LABEL_PREFIX, LABEL_WORD, KEY_PREFIX, KEY_WORD = range(4)
+
+# Sıralı dizide önek aralığının üst sınırı için en büyük karakter
+_MAX_CHAR = "\U0010ffff"
+
+
+def fold_text(text):
+    # Arama için normalleştir: Türkçe küçük harf, aksanları at, boşlukları sadeleştir
+    text = text.translate(_TURKISH_LOWER).lower().translate(_ASCII_FOLD)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.split())
+
+
+class SymptomIndex:
+    # Türkçe etiketler ve İngilizce anahtarlar üzerinde sıralı önek dizisi (yükleme sırasında bir kez kurulur).
+    # Her terim hem tam metnin hem de her kelimenin başlangıcından eklenir: "ağrı" -> "Karın Ağrısı".
+    def __init__(self, items):
+        # items: [(etiket, değer)]; değer modelin semptom adı
+        self.items = list(items)
+        entries = []
+        for item_index, (label, value) in enumerate(self.items):
+            for text, prefix_kind, word_kind in ((label, LABEL_PREFIX, LABEL_WORD), (value, KEY_PREFIX, KEY_WORD)):
+                words = fold_text(text).split(" ")
+                for start in range(len(words)):
+                    entries.append((" ".join(words[start:]), prefix_kind if start == 0 else word_kind, item_index))
+        entries.sort()
+        self.terms = [term for term, _, _ in entries]
+        self.entries = [(kind, item_index) for _, kind, item_index in entries]
+
+        # Eşitlikte kısa ve alfabetik olarak önce gelen etiket kazanır
+        self._tiebreak = [(len(label), fold_text(label)) for label, _ in self.items]
+
+    def search(self, query, limit=10):
+        query = fold_text(query)
+        if not query or limit <= 0:
+            return []
+
+        lo = bisect_left(self.terms, query)
+        hi = bisect_left(self.terms, query + _MAX_CHAR, lo)
+
+        # Her semptom için en iyi eşleşme türünü tut
+        best = {}
+        for kind, item_index in self.entries[lo:hi]:
+            if kind < best.get(item_index, KEY_WORD + 1):
+                best[item_index] = kind
+
+        ranked = sorted(best, key=lambda i: (best[i], self._tiebreak[i]))[:limit]
+        return [{"label": self.items[i][0], "value": self.items[i][1]} for i in ranked]
@@ -1,4 +1,21 @@
+import os
+
 def clean_symptom(symptom):
     if isinstance(symptom, str):
         return symptom.replace('_', ' ').strip()
     return symptom
+
+def current_rss_bytes():
+    # Sürecin anlık yerleşik bellek (RSS) kullanımı; desteklenmiyorsa None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Linux dışındaki sistemlerde yalnızca en yüksek değer mevcut (macOS: bayt, diğerleri: KB)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+    except (ImportError, AttributeError):
+        return None
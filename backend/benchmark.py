@@ -0,0 +1,310 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.bundle import load_bundle
+from app.encoder import SymptomEncoder
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, 'data', 'dataset.csv')
+
+def summarize(latencies, total_time=None):
+    # Gecikmeler saniye cinsinden; rapor milisaniye ve saniyedeki istek sayısı
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if total_time is None:
+        total_time = float(latencies.sum())
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "count": int(latencies.size),
+        "mean_ms": float(latencies.mean() * 1000),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latencies.max() * 1000),
+        "rps": float(latencies.size / total_time) if total_time > 0 else None,
+    }
+
+def time_calls(fn, inputs, warmup=10):
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    for item in inputs:
+        t = time.perf_counter()
+        result = fn(item)
+        latencies.append(time.perf_counter() - t)
+        # API çağrıları: hızlı 4xx/5xx yanıtları başarılı çağrı gibi görünmesin
+        status = getattr(result, "status_code", None)
+        if status is not None:
+            statuses[status] = statuses.get(status, 0) + 1
+    stats = summarize(latencies, time.perf_counter() - start)
+    if statuses:
+        stats["status_codes"] = {str(k): v for k, v in sorted(statuses.items())}
+    return stats
+
+def sample_symptom_sets(n, seed=0):
+    # Gerçekçi girdiler: veri setinden rastgele satırlar, her satırdan rastgele sayıda semptom
+    df = pd.read_csv(DATA_PATH)
+    symptom_cols = [col for col in df.columns if 'Symptom' in col]
+    rng = random.Random(seed)
+    rows = df[symptom_cols].sample(n, replace=True, random_state=seed).values
+    symptom_sets = []
+    for row in rows:
+        symptoms = [str(s).strip().replace('_', ' ') for s in row if pd.notna(s)]
+        rng.shuffle(symptoms)
+        symptom_sets.append(symptoms[:rng.randint(1, len(symptoms))])
+    return symptom_sets
+
+@contextlib.contextmanager
+def quiet():
+    # Yükleme ve eğitim mesajları benchmark çıktısını kirletmesin
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_load(engine, repeats):
+    latencies = []
+    for _ in range(repeats):
+        with quiet():
+            start = time.perf_counter()
+            load_bundle(engine=engine)
+            latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+def bench_cold_start(engine):
+    # Yeni bir süreçte içe aktarma + yükleme süresi ve yükleme sonrası RSS (soğuk başlangıç)
+    import subprocess
+
+    code = (
+        "import json, time; start = time.perf_counter(); "
+        "from app.bundle import load_bundle; from app.utils import current_rss_bytes; "
+        f"load_bundle(engine={engine!r}); "
+        "print(json.dumps({'load_s': time.perf_counter() - start, 'rss_mb': current_rss_bytes() / 1048576}))"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def bench_model(engine, symptom_sets, batch_size):
+    with quiet():
+        bundle = load_bundle(engine=engine)
+    encoder = bundle.encoder
+
+    def single(symptoms):
+        columns, _ = encoder.lookup(symptoms)
+        bundle.format_prediction(bundle.predict_proba(encoder.encode_columns(columns))[0])
+
+    batches = [symptom_sets[i:i + batch_size] for i in range(0, len(symptom_sets), batch_size)]
+
+    def batch(sets):
+        X, _ = encoder.encode_batch(sets)
+        for row in bundle.predict_proba(X):
+            bundle.format_prediction(row)
+
+    batch_stats = time_calls(batch, batches, warmup=2)
+    # Satır başına verim (toplu iş başına değil)
+    batch_stats["rows_per_s"] = batch_stats["rps"] * batch_size if batch_stats["rps"] else None
+    return {
+        "single": time_calls(single, symptom_sets),
+        f"batch_{batch_size}": batch_stats,
+    }
+
+def bench_api(engine, symptom_sets, batch_size, concurrency):
+    from fastapi.testclient import TestClient
+    from app import main
+
+    results = {}
+    with quiet(), TestClient(main.app) as client:
+        main.bundle = load_bundle(engine=engine)
+        cache_size = main.prediction_cache.maxsize
+
+        # Önbellek kapalı: her istek modeli çalıştırır
+        main.prediction_cache.maxsize = 0
+        main.prediction_cache.clear()
+        results["predict"] = time_calls(lambda s: client.post('/predict', json={'symptoms': s}), symptom_sets)
+        batches = [symptom_sets[i:i + batch_size] for i in range(0, len(symptom_sets), batch_size)]
+        results[f"predict_batch_{batch_size}"] = time_calls(
+            lambda sets: client.post('/predict/batch', json={'symptom_sets': sets}), batches, warmup=2)
+
+        # Önbellek açık: tekrar eden kümeler çıkarımı atlar
+        main.prediction_cache.maxsize = cache_size
+        for symptoms in symptom_sets:
+            client.post('/predict', json={'symptoms': symptoms})
+        results["predict_cached"] = time_calls(lambda s: client.post('/predict', json={'symptoms': s}), symptom_sets)
+
+        results["symptoms"] = time_calls(lambda _: client.get('/symptoms'), symptom_sets)
+        etag = client.get('/symptoms').headers.get('etag')
+        results["symptoms_304"] = time_calls(lambda _: client.get('/symptoms', headers={'If-None-Match': etag}), symptom_sets)
+
+        if concurrency > 1:
+            main.prediction_cache.maxsize = 0
+            main.prediction_cache.clear()
+            results[f"predict_concurrent_{concurrency}"] = asyncio.run(_bench_concurrent(main.app, symptom_sets, concurrency))
+            main.prediction_cache.maxsize = cache_size
+    return results
+
+async def _bench_concurrent(app, symptom_sets, concurrency):
+    # Sabit sayıda eşzamanlı istemci; sunucu tarafı sınırlayıcılar (havuz, mikro toplu işleme) etkin
+    import httpx
+
+    latencies = []
+    statuses = {}
+    queue = list(reversed(symptom_sets))
+
+    async def client_loop(client):
+        while queue:
+            symptoms = queue.pop()
+            t = time.perf_counter()
+            response = await client.post('/predict', json={'symptoms': symptoms})
+            latencies.append(time.perf_counter() - t)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[client_loop(client) for _ in range(concurrency)])
+        total = time.perf_counter() - start
+    return dict(summarize(latencies, total), status_codes={str(k): v for k, v in statuses.items()})
+
+def bench_training(n_jobs):
+    # Eğitim aşamaları train_model.py ile aynı, ancak artefakt yazılmaz
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import train_test_split
+    from app.forest import flatten_forest
+
+    timings = {}
+    start = time.perf_counter()
+    df = pd.read_csv(DATA_PATH)
+    timings["read_csv_s"] = time.perf_counter() - start
+
+    t = time.perf_counter()
+    symptom_cols = [col for col in df.columns if 'Symptom' in col]
+    records = df[symptom_cols].values
+    encoder = SymptomEncoder.from_records(records)
+    X = encoder.transform_records(records)
+    timings["encode_s"] = time.perf_counter() - t
+
+    X_train, _, y_train, _ = train_test_split(X, df['Disease'], test_size=0.2, random_state=42)
+    t = time.perf_counter()
+    clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs).fit(X_train, y_train)
+    timings["fit_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    flatten_forest(clf, encoder.symptoms)
+    timings["flatten_s"] = time.perf_counter() - t
+    timings["total_s"] = time.perf_counter() - start
+
+    # train_model.py --dedupe: tekrarlanan satırlar ağırlıklı tekil satırlara indirgenir
+    from train_model import deduplicate
+
+    t = time.perf_counter()
+    X_unique, y_unique, counts = deduplicate(X, df['Disease'])
+    timings["dedupe_s"] = time.perf_counter() - t
+    timings["dedupe_ratio"] = X.shape[0] / X_unique.shape[0]
+    X_train, _, y_train, _, w_train, _ = train_test_split(X_unique, y_unique, counts, test_size=0.2, random_state=42)
+    t = time.perf_counter()
+    RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs).fit(X_train, y_train, sample_weight=w_train)
+    timings["fit_dedupe_s"] = time.perf_counter() - t
+    return timings
+
+def _flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and "p50_ms" not in value:
+            yield from _flatten(value, f"{name}.")
+        else:
+            yield name, value
+
+def print_report(results, baseline=None):
+    baseline_rows = dict(_flatten(baseline["results"])) if baseline else {}
+    print(f"{'benchmark':<44} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>10} {'vs base p50':>12}")
+    for name, value in _flatten(results):
+        if isinstance(value, dict):
+            rps = f"{value['rps']:.1f}" if value.get("rps") else "-"
+            line = f"{name:<44} {value['p50_ms']:>9.3f} {value['p95_ms']:>9.3f} {value['p99_ms']:>9.3f} {rps:>10}"
+            old = baseline_rows.get(name)
+            if isinstance(old, dict) and old.get("p50_ms"):
+                line += f" {(value['p50_ms'] / old['p50_ms'] - 1) * 100:>+11.1f}%"
+            # 304 beklenen bir yanıt (symptoms_304); 4xx/5xx hatalı çağrıdır
+            failed = sum(n for code, n in value.get("status_codes", {}).items() if int(code) >= 400)
+            if failed:
+                line += f"  [{failed} errors: {value['status_codes']}]"
+            print(line)
+        else:
+            line = f"{name:<44} {value:>9.3f}{' s' if name.endswith('_s') else ''}"
+            old = baseline_rows.get(name)
+            if isinstance(old, (int, float)) and old:
+                line += f" {'':>30} {(value / old - 1) * 100:>+11.1f}%"
+            print(line)
+
+def run_benchmarks(args):
+    symptom_sets = sample_symptom_sets(args.requests, seed=args.seed)
+    results = {}
+    for engine in args.engine:
+        print(f"Benchmarking engine: {engine}")
+        results[engine] = {
+            "load": bench_load(engine, args.load_repeats),
+            "cold_start": bench_cold_start(engine),
+            "model": bench_model(engine, symptom_sets, args.batch_size),
+        }
+        if not args.skip_api:
+            results[engine]["api"] = bench_api(engine, symptom_sets, args.batch_size, args.concurrency)
+    if not args.skip_train:
+        print("Benchmarking training...")
+        with quiet():
+            results["training"] = bench_training(args.n_jobs)
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark MediMind model inference, API latency, artifact loading and training.")
+    parser.add_argument("--engine", nargs="+", choices=["sklearn", "flat", "compact"], default=["sklearn", "flat"], help="inference engines to benchmark (compact: build models/medimind_bundle.npz first with python -m app.compact)")
+    parser.add_argument("--requests", type=int, default=500, help="symptom sets sampled from dataset.csv")
+    parser.add_argument("--batch-size", type=int, default=64, help="rows per batched call")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent API clients (1 = skip the concurrent run)")
+    parser.add_argument("--load-repeats", type=int, default=5, help="artifact loads to time per engine")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="CPU cores for the training benchmark")
+    parser.add_argument("--skip-api", action="store_true", help="skip the end-to-end API benchmarks")
+    parser.add_argument("--skip-train", action="store_true", help="skip the training benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for symptom sampling")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_benchmarks(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        import sklearn
+
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "scikit-learn": sklearn.__version__,
+                "args": vars(args),
+            },
+            "results": results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
 
-def preprocess_data():
+from app.dataset import ProcessedWriter, save_processed
+from app.encoder import SymptomEncoder
+
+def preprocess_data(output_format="csv", output_path=None, dataset_path=None):
     # Dosya yollarını tanımla
     # Betiğin backend dizininden çalıştırıldığı veya yolların buna göre olduğu varsayılıyor
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    dataset_path = os.path.join(base_dir, 'data', 'dataset.csv')
-    output_path = os.path.join(base_dir, 'data', 'training_data_processed.csv')
+    dataset_path = dataset_path or os.path.join(base_dir, 'data', 'dataset.csv')
+    if output_path is None:
+        output_path = os.path.join(base_dir, 'data', f'training_data_processed.{output_format}')
 
     # Dosyanın var olup olmadığını kontrol et
     if not os.path.exists(dataset_path):
@@ -18,63 +23,33 @@ def preprocess_data():
     df = pd.read_csv(dataset_path)
     print(f"Original dataframe shape: {df.shape}")
 
-    # Daha sonra doğru şekilde birleştirebilmek için açık bir row_id oluştur
-    df['row_id'] = range(len(df))
-
     # Veri setinde 'Disease' ve 'Symptom_1'den 'Symptom_17'ye kadar sütunlar var
     
     # Tüm semptom sütunlarını al
     symptom_cols = [col for col in df.columns if 'Symptom' in col]
-    
-    print("Cleaning symptom names...")
-    # Semptom metinlerini temizleme fonksiyonu
-    def clean_symptom(x):
-        if pd.isna(x):
-            return x
-        if isinstance(x, str):
-            return x.replace('_', ' ').strip()
-        return x
-
-    # Temizlemeyi tüm semptom sütunlarına uygula
-    for col in symptom_cols:
-        df[col] = df[col].apply(clean_symptom)
+    records = df[symptom_cols].values
 
     print("Extracting unique symptoms...")
-    # Tüm veri çerçevesinden benzersiz semptomları al (Hastalık sütunu hariç)
-    all_symptoms = pd.unique(df[symptom_cols].values.ravel())
-    unique_symptoms = [s for s in all_symptoms if pd.notna(s)]
-    unique_symptoms.sort()
+    # Semptom adları eğitim ve API ile aynı kodlayıcıda temizlenir (boşluk kırpma, '_' -> ' ')
+    encoder = SymptomEncoder.from_records(records)
+    unique_symptoms = encoder.symptoms
     print(f"Found {len(unique_symptoms)} unique symptoms.")
 
     print("Creating binary dataframe...")
-    
-    # 1. Uzun formata dönüştür (Melt)
-    # Hangi hastanın hangi semptoma sahip olduğunu izlemek için row_id'yi tutuyoruz
-    df_melted = df.melt(id_vars=['row_id'], value_vars=symptom_cols, value_name='Symptom')
-    
-    # 2. Semptomun NaN olduğu satırları at
-    df_melted = df_melted.dropna(subset=['Symptom'])
-    
-    # 3. İkili matrisi oluşturmak için crosstab kullan
-    # indeks=row_id, sütunlar=Symptom
-    df_binary = pd.crosstab(df_melted['row_id'], df_melted['Symptom'])
-    
-    # İkili olduğundan emin ol
-    df_binary = (df_binary > 0).astype(int)
-    
-    print(f"Binary dataframe shape: {df_binary.shape}")
-    print(f"df row_id unique count: {df['row_id'].nunique()}")
-    print(f"df_binary index unique count: {df_binary.index.nunique()}")
-    
-    # 4. Orijinal veri çerçevesinden Hastalık sütunu ile birleştir
-    # Doğru hizalamayı sağlamak için row_id üzerinde birleştiriyoruz
-    final_df = pd.merge(df[['row_id', 'Disease']], df_binary, on='row_id', how='left')
-    
-    # NaN'ları 0 ile doldur (semptomu olmayan hastalar için, varsa)
-    final_df = final_df.fillna(0)
-    
-    # Artık gerekli olmadığı için row_id'yi at
-    final_df = final_df.drop('row_id', axis=1)
+    # Tek geçişte seyrek ikili matris (satır = hasta, sütun = semptom)
+    X = encoder.transform_records(records)
+    print(f"Binary matrix shape: {X.shape}, non-zero entries: {X.nnz}")
+
+    if output_format == "npz":
+        # Seyrek biçim: yalnızca sıfır olmayan hücreler, etiketler ve semptom sözlüğü (train_model.py --data)
+        print("Saving processed data...")
+        save_processed(output_path, X, df['Disease'].values, unique_symptoms)
+        print(f"Successfully saved to {output_path} ({os.path.getsize(output_path) / 1024:.1f} KB)")
+        return
+
+    # Hastalık sütunu ile birleştir (satır sırası korunur)
+    final_df = pd.DataFrame(X.toarray().astype(int), columns=unique_symptoms)
+    final_df.insert(0, 'Disease', df['Disease'].values)
     
     print("Saving processed data...")
     final_df.to_csv(output_path, index=False)
@@ -84,5 +59,77 @@ def preprocess_data():
     print("First 5 rows:")
     print(final_df.head())
 
+def load_vocabulary(path):
+    # Sabit semptom sözlüğü: eğitilmiş modelin symptoms_list.joblib dosyası veya satır başına bir semptom
+    if path.endswith('.joblib'):
+        import joblib
+
+        return list(joblib.load(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def preprocess_streaming(chunksize, output_format="csv", output_path=None, vocabulary_path=None, dataset_path=None):
+    # Veri setini bloklar halinde okuyup kodlanmış satırları çıktıya ekler.
+    # Bellekte aynı anda yalnızca bir blok bulunur; veri setinin boyutundan bağımsızdır.
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    dataset_path = dataset_path or os.path.join(base_dir, 'data', 'dataset.csv')
+    if output_path is None:
+        output_path = os.path.join(base_dir, 'data', f'training_data_processed.{output_format}')
+
+    if not os.path.exists(dataset_path):
+        print(f"Error: File not found at {dataset_path}")
+        return
+
+    symptom_cols = [col for col in pd.read_csv(dataset_path, nrows=0).columns if 'Symptom' in col]
+
+    def read_chunks(columns):
+        # dtype=str: tamamen boş bir blokta bile semptom sütunları metin olarak okunur
+        return pd.read_csv(dataset_path, usecols=columns, dtype=str, keep_default_na=True, chunksize=chunksize)
+
+    if vocabulary_path:
+        encoder = SymptomEncoder(load_vocabulary(vocabulary_path))
+        print(f"Using fixed vocabulary of {encoder.n_features} symptoms from {vocabulary_path}")
+    else:
+        # 1. geçiş: yalnızca semptom sütunlarından sözlüğü oluştur
+        print("Pass 1: extracting unique symptoms...")
+        encoder = SymptomEncoder.from_chunks(chunk[symptom_cols].values for chunk in read_chunks(symptom_cols))
+        print(f"Found {encoder.n_features} unique symptoms.")
+
+    # 2. geçiş: her bloğu kodla ve çıktıya ekle
+    print(f"Pass 2: encoding in chunks of {chunksize} rows...")
+    n_rows = 0
+    if output_format == "npz":
+        with ProcessedWriter(output_path, encoder.symptoms) as writer:
+            for chunk in read_chunks(['Disease'] + symptom_cols):
+                writer.append(encoder.transform_records(chunk[symptom_cols].values), chunk['Disease'].values)
+                n_rows += len(chunk)
+                print(f"Encoded {n_rows} rows")
+    else:
+        tmp_path = f"{output_path}.tmp"
+        for i, chunk in enumerate(read_chunks(['Disease'] + symptom_cols)):
+            X = encoder.transform_records(chunk[symptom_cols].values)
+            chunk_df = pd.DataFrame(X.toarray().astype(int), columns=encoder.symptoms)
+            chunk_df.insert(0, 'Disease', chunk['Disease'].values)
+            chunk_df.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            n_rows += len(chunk)
+            print(f"Encoded {n_rows} rows")
+        os.replace(tmp_path, output_path)
+
+    print(f"Successfully saved to {output_path}")
+    print(f"Shape of processed data: ({n_rows}, {encoder.n_features + (1 if output_format == 'csv' else 0)})")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert dataset.csv into a binary symptom matrix.")
+    parser.add_argument("--format", choices=["csv", "npz"], default="csv", help="dense CSV or sparse .npz (CSR + labels + vocabulary)")
+    parser.add_argument("--input", help="source CSV with Disease and Symptom_* columns (default: data/dataset.csv)")
+    parser.add_argument("--output", help="output file (default: data/training_data_processed.<format>)")
+    parser.add_argument("--chunksize", type=int, help="stream the dataset in chunks of this many rows (bounded memory)")
+    parser.add_argument("--vocabulary", help="fixed symptom vocabulary (.joblib list or one symptom per line); skips the vocabulary pass")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    preprocess_data()
+    args = parse_args()
+    if args.chunksize:
+        preprocess_streaming(args.chunksize, output_format=args.format, output_path=args.output, vocabulary_path=args.vocabulary, dataset_path=args.input)
+    else:
+        preprocess_data(output_format=args.format, output_path=args.output, dataset_path=args.input)
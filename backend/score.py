@@ -0,0 +1,258 @@
+import argparse
+import collections
+import contextlib
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app.bundle import BASE_DIR, TOP_PREDICTIONS, load_bundle
+
+# --resume: son tam satırı bulmak için çıktının sonundan okunan bayt sayısı
+RESUME_TAIL_BYTES = 1 << 20
+
+CSV_FIELDS = ["row", "disease", "disease_key", "confidence", "top_predictions", "unknown_symptoms"]
+
+
+def file_format(path):
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _split_symptoms(cell, separator):
+    if not isinstance(cell, str):
+        return []
+    return [sym.strip() for sym in cell.split(separator) if sym.strip()]
+
+
+def read_chunks(path, chunksize, start_row=0, symptom_column="symptoms", separator=";", id_column=None):
+    # Girdiyi bloklar halinde okur; döner: (ilk satır numarası, kimlikler veya None, semptom listeleri).
+    # CSV: ayraçlı tek bir semptom sütunu veya dataset.csv gibi Symptom_* sütunları. JSONL: satır başına
+    # {"symptoms": [...]} nesnesi veya düz liste. Satır numaraları boş olmayan veri satırlarını sayar.
+    row = start_row
+    if file_format(path) == "jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            records = itertools.islice((line for line in f if line.strip()), start_row, None)
+            while True:
+                lines = list(itertools.islice(records, chunksize))
+                if not lines:
+                    return
+                ids, symptom_sets = [], []
+                for index, line in enumerate(lines):
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"{path}: record at row {row + index} is not valid JSON ({e}).")
+                    if isinstance(record, list):
+                        record = {symptom_column: record}
+                    if not isinstance(record, dict):
+                        raise ValueError(f"{path}: record at row {row + index} is not an object or a list "
+                                         f"(got {type(record).__name__}).")
+                    symptoms = record.get(symptom_column) or []
+                    if not isinstance(symptoms, list):
+                        raise ValueError(f"{path}: '{symptom_column}' at row {row + index} is not a list "
+                                         f"(got {type(symptoms).__name__}).")
+                    ids.append(record.get(id_column) if id_column else None)
+                    symptom_sets.append([str(sym) for sym in symptoms])
+                yield row, ids if id_column else None, symptom_sets
+                row += len(lines)
+
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    if symptom_column in columns:
+        symptom_cols = [symptom_column]
+    else:
+        symptom_cols = [col for col in columns if 'Symptom' in col]
+        if not symptom_cols:
+            raise ValueError(f"{path} has no '{symptom_column}' or Symptom_* columns.")
+    if id_column and id_column not in columns:
+        raise ValueError(f"{path} has no '{id_column}' column.")
+    usecols = symptom_cols + ([id_column] if id_column else [])
+
+    # dtype=str: kimlikler ve semptomlar olduğu gibi okunur. Atlama fiziksel satırlarla değil, pandas'ın
+    # ayrıştırdığı kayıtlarla yapılır (boş satırlar sayılmaz), böylece satır numaraları JSONL ile aynı anlamdadır
+    to_skip = start_row
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=str, chunksize=chunksize):
+        if to_skip >= len(chunk):
+            to_skip -= len(chunk)
+            continue
+        chunk = chunk.iloc[to_skip:]
+        to_skip = 0
+        if symptom_cols == [symptom_column]:
+            symptom_sets = [_split_symptoms(cell, separator) for cell in chunk[symptom_column]]
+        else:
+            symptom_sets = [[sym for sym in cells if isinstance(sym, str)] for cells in chunk[symptom_cols].values]
+        ids = chunk[id_column].tolist() if id_column else None
+        yield row, ids, symptom_sets
+        row += len(chunk)
+
+
+# Süreç havuzu çalışanlarının model paketi (her çalışan artefaktları bir kez yükler)
+_worker_bundle = None
+
+
+def _init_worker(base_dir, engine):
+    global _worker_bundle
+    with contextlib.redirect_stdout(io.StringIO()):
+        _worker_bundle = load_bundle(base_dir, engine)
+
+
+def score_chunk(first_row, ids, symptom_sets, output_format):
+    # Bloğu tek bir predict_proba matrisi olarak puanla ve çıktı satırlarını metin olarak döndür
+    current = _worker_bundle
+    encoder = current.encoder
+    lookups = [encoder.lookup(symptoms) for symptoms in symptom_sets]
+
+    # Blok içinde tekrar eden semptom kümeleri bir kez hesaplanır
+    unique = {}
+    rows = [unique.setdefault(encoder.canonical(columns), len(unique)) for columns, _ in lookups]
+    probabilities = current.predict_proba(encoder.encode_column_sets(list(unique)))
+
+    # Olasılığa göre azalan, eşitlikte sınıf sırası (API ile aynı); ilk sütun argmax
+    top = np.argsort(-probabilities, axis=1, kind="stable")[:, :TOP_PREDICTIONS]
+    classes = current.model.classes_
+    names = [info["name"] for info in current.disease_store.by_index]
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n") if output_format == "csv" else None
+    unknown_count = 0
+    for offset, ((_, unknown), unique_row) in enumerate(zip(lookups, rows)):
+        p = probabilities[unique_row]
+        best = top[unique_row]
+        # /predict ile aynı liste (%1 altındaki tahminler dahil edilmez)
+        top_predictions = current.top_predictions(p, best)
+        unknown_count += len(unknown)
+        record = {"row": first_row + offset}
+        if ids is not None:
+            record["id"] = ids[offset]
+        record.update(
+            disease=names[best[0]],
+            disease_key=str(classes[best[0]]),
+            confidence=float(p[best[0]]),
+            top_predictions=top_predictions,
+            unknown_symptoms=unknown,
+        )
+        if writer is None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            record["top_predictions"] = json.dumps(top_predictions, ensure_ascii=False)
+            record["unknown_symptoms"] = json.dumps(unknown, ensure_ascii=False)
+            writer.writerow(record.values())
+    return out.getvalue(), len(symptom_sets), unknown_count
+
+
+def resume_row(path, output_format):
+    # Çıktıdaki son tam satırdan sonraki satır numarası; kesinti sırasında yarım yazılmış son satır silinir
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - RESUME_TAIL_BYTES)
+        f.seek(start)
+        tail = f.read()
+        end = tail.rfind(b"\n")
+        if end < 0:
+            f.truncate(start)
+            return 0
+        f.truncate(start + end + 1)
+    last = tail[:end].rsplit(b"\n", 1)[-1].decode("utf-8")
+    if output_format == "jsonl":
+        return json.loads(last)["row"] + 1
+    field = last.split(",", 1)[0]
+    # Yalnızca başlık yazılmışsa baştan başla
+    return int(field) + 1 if field.isdigit() else 0
+
+
+def score_file(input_path, output_path, chunksize=10000, workers=None, engine=None, start_row=0, resume=False,
+               symptom_column="symptoms", separator=";", id_column=None, base_dir=BASE_DIR):
+    output_format = file_format(output_path)
+    if resume and os.path.exists(output_path):
+        start_row = resume_row(output_path, output_format)
+        print(f"Resuming from row {start_row}")
+    append = start_row > 0 or resume
+
+    # Ana süreçte bir kez yükle: artefakt hataları çalışanlar başlamadan görünür
+    bundle = load_bundle(base_dir, engine)
+    engine = bundle.engine
+    workers = max(1, workers or os.cpu_count() or 1)
+    print(f"Scoring {input_path} -> {output_path} (model: {bundle.version}, engine: {engine}, "
+          f"workers: {workers}, chunksize: {chunksize})")
+
+    chunks = read_chunks(input_path, chunksize, start_row, symptom_column, separator, id_column)
+    pool = None
+    if workers > 1:
+        # spawn: inference.py ile aynı; her çalışan paketi kendisi yükler
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(base_dir, engine),
+        )
+    else:
+        global _worker_bundle
+        _worker_bundle = bundle
+
+    n_rows = 0
+    n_unknown = 0
+    start = time.perf_counter()
+    write_header = output_format == "csv" and not (append and os.path.exists(output_path) and os.path.getsize(output_path) > 0)
+    with open(output_path, "a" if append else "w", encoding="utf-8", newline="") as out:
+        if write_header:
+            out.write(",".join(CSV_FIELDS[:1] + (["id"] if id_column else []) + CSV_FIELDS[1:]) + "\n")
+
+        def write(text, rows, unknown):
+            nonlocal n_rows, n_unknown
+            # Her blok sırayla yazılır ve diske aktarılır; kesintide --resume son tam satırdan devam eder
+            out.write(text)
+            out.flush()
+            n_rows += rows
+            n_unknown += unknown
+            elapsed = time.perf_counter() - start
+            print(f"Scored {n_rows} rows (up to row {start_row + n_rows - 1}, {n_rows / elapsed:.0f} rows/s)")
+
+        try:
+            if pool is None:
+                for first_row, ids, symptom_sets in chunks:
+                    write(*score_chunk(first_row, ids, symptom_sets, output_format))
+            else:
+                # Uçuştaki blok sayısı sınırlı: bellek kullanımı girdi boyutundan bağımsız
+                in_flight = collections.deque()
+                for first_row, ids, symptom_sets in chunks:
+                    in_flight.append(pool.submit(score_chunk, first_row, ids, symptom_sets, output_format))
+                    if len(in_flight) >= 2 * workers:
+                        write(*in_flight.popleft().result())
+                while in_flight:
+                    write(*in_flight.popleft().result())
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Finished: {n_rows} rows in {elapsed:.1f}s ({n_rows / max(elapsed, 1e-9):.0f} rows/s), "
+          f"{n_unknown} unknown symptoms. Results saved to {output_path}")
+    return n_rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL file of symptom lists with the MediMind model.")
+    parser.add_argument("input", help="CSV (a symptom list column or Symptom_* columns) or JSONL ({\"symptoms\": [...]} per line)")
+    parser.add_argument("output", help="output .csv or .jsonl file (written as scoring progresses)")
+    parser.add_argument("--engine", choices=["sklearn", "flat", "compact"], help="inference engine (default: MEDIMIND_INFERENCE_ENGINE)")
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (0 = CPU count, 1 = in-process)")
+    parser.add_argument("--chunksize", type=int, default=10000, help="records read and scored per chunk")
+    parser.add_argument("--start-row", type=int, default=0, help="skip this many input records and append to the output")
+    parser.add_argument("--resume", action="store_true", help="continue after the last complete row in an existing output file")
+    parser.add_argument("--symptom-column", default="symptoms", help="column (CSV) or key (JSONL) holding the symptom list")
+    parser.add_argument("--separator", default=";", help="separator inside the CSV symptom list column")
+    parser.add_argument("--id-column", help="record identifier copied to the output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    score_file(args.input, args.output, chunksize=args.chunksize, workers=args.workers, engine=args.engine,
+               start_row=args.start_row, resume=args.resume, symptom_column=args.symptom_column,
+               separator=args.separator, id_column=args.id_column)
@@ -1,19 +1,110 @@
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
 from sklearn.metrics import accuracy_score
+import argparse
 import joblib
 import os
+import time
 
-def train_model():
-    print("Loading dataset...")
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    data_path = os.path.join(base_dir, 'data', 'dataset.csv')
-    
-    if not os.path.exists(data_path):
-        print(f"Error: {data_path} not found.")
-        return
+from app.dataset import load_processed
+from app.encoder import SymptomEncoder
+from app.forest import flatten_forest
+from app.guidance import DiseaseSymptomMatrix, load_severity
+
+# Çapraz doğrulamalı arama için varsayılan hiperparametre ızgarası
+DEFAULT_PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 20],
+    "max_features": ["sqrt", "log2"],
+}
+
+def _node_count(estimator, X=None, y=None):
+    # Model boyutu ölçüsü: ormandaki toplam düğüm sayısı
+    return sum(tree.tree_.node_count for tree in estimator.estimators_)
+
+def _search_scores(estimator, X, y, sample_weight=None):
+    # GridSearchCV puanları: doğruluk (tekilleştirilmiş veride satır sayılarıyla ağırlıklı) ve model boyutu
+    return {
+        "accuracy": accuracy_score(y, estimator.predict(X), sample_weight=sample_weight),
+        "nodes": _node_count(estimator),
+    }
+
+def deduplicate(X, y, chunk_rows=100000):
+    # Aynı (hastalık, semptom kümesi) satırlarını tek satırda birleştir; döner: (X, y, sayılar).
+    # İkili matris satırı sütun sırasından bağımsızdır, bu yüzden kümeler zaten kanoniktir.
+    X = X.tocsr()
+    classes, codes = np.unique(np.asarray(y, dtype=str), return_inverse=True)
+    keys = []
+    for start in range(0, X.shape[0], chunk_rows):
+        # Satır başına sabit genişlikli anahtar: etiket kodu + bit paketlenmiş semptomlar
+        bits = np.packbits(X[start:start + chunk_rows].toarray() > 0, axis=1)
+        label = codes[start:start + chunk_rows].astype('>u4').reshape(-1, 1).view(np.uint8)
+        keys.append(np.hstack([label, bits]))
+    keys = np.ascontiguousarray(np.vstack(keys))
+    keys = keys.view(np.dtype((np.void, keys.shape[1]))).ravel()
+
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    # İlk görülme sırasını koru (deterministik bölme ve eğitim)
+    order = np.argsort(first)
+    first, counts = first[order], counts[order]
+    y_unique = y.iloc[first] if hasattr(y, 'iloc') else np.asarray(y)[first]
+    return X[first], y_unique, counts
+
+def fit_forest(clf, X_train, y_train, X_test, y_test, w_train=None, w_test=None):
+    start = time.perf_counter()
+    clf.fit(X_train, y_train, sample_weight=w_train)
+    fit_time = time.perf_counter() - start
+
+    y_pred = clf.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    if w_test is not None:
+        # Tekil satırlar üzerindeki doğruluk ve orijinal satır dağılımına göre ağırlıklı doğruluk
+        weighted = accuracy_score(y_test, y_pred, sample_weight=w_test)
+        print(f"Model Accuracy: {accuracy * 100:.2f}% on unique rows, {weighted * 100:.2f}% weighted by row counts "
+              f"(fit: {fit_time:.2f}s, trees: {len(clf.estimators_)}, nodes: {_node_count(clf)})")
+    else:
+        print(f"Model Accuracy: {accuracy * 100:.2f}% (fit: {fit_time:.2f}s, trees: {len(clf.estimators_)}, nodes: {_node_count(clf)})")
+    return clf, fit_time
+
+def search_forest(X_train, y_train, param_grid, n_jobs, cv=5, sample_weight=None):
+    # Her yapılandırma × katman tüm çekirdeklere dağıtılır; ağaçlar tek iş parçacığında eğitilir.
+    # refit=False: en iyi yapılandırma train_model'de bir kez eğitilir (arama içinde ikinci kez eğitilmez)
+    search = GridSearchCV(
+        RandomForestClassifier(random_state=42, n_jobs=1),
+        param_grid,
+        scoring=_search_scores,
+        refit=False,
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=42),
+        n_jobs=n_jobs,
+    )
+    start = time.perf_counter()
+    search.fit(X_train, y_train, sample_weight=sample_weight)
+    print(f"Search finished in {time.perf_counter() - start:.2f}s ({len(search.cv_results_['params'])} configurations, {cv} folds)")
+
+    # Yapılandırma başına doğruluk, süre ve model boyutu
+    results = search.cv_results_
+    width = max(len(str(params)) for params in results["params"])
+    print(f"{'params':<{width}} {'accuracy':>16} {'fit (s)':>8} {'score (s)':>9} {'nodes':>8}")
+    for i in np.argsort(results["rank_test_accuracy"], kind="stable"):
+        accuracy = f"{results['mean_test_accuracy'][i] * 100:.2f} ± {results['std_test_accuracy'][i] * 100:.2f}%"
+        print(
+            f"{str(results['params'][i]):<{width}} {accuracy:>16} "
+            f"{results['mean_fit_time'][i]:>8.3f} {results['mean_score_time'][i]:>9.3f} "
+            f"{results['mean_test_nodes'][i]:>8.0f}"
+        )
+    best_params = results["params"][int(np.argmin(results["rank_test_accuracy"]))]
+    print(f"Best parameters: {best_params}")
+    return best_params
+
+def load_dataset(data_path):
+    # Ham dataset.csv veya preprocess.py --format npz çıktısı; döner: (X, y, semptomlar)
+    if data_path.endswith('.npz'):
+        # Önceden işlenmiş seyrek matris: CSV ayrıştırma ve kodlama adımı yok
+        X, y, unique_symptoms = load_processed(data_path)
+        print(f"Loaded processed matrix {X.shape} with {len(unique_symptoms)} symptoms.")
+        return X, y, unique_symptoms
 
     df = pd.read_csv(data_path)
     
@@ -26,55 +117,138 @@ def train_model():
     # Tüm semptom sütunlarını al
     symptom_cols = [col for col in df.columns if 'Symptom' in col]
     
-    # Semptom metinlerini temizle (boşlukları kaldır, alt çizgileri değiştir)
-    for col in symptom_cols:
-        df[col] = df[col].str.strip().str.replace('_', ' ')
-    
-    # Tüm benzersiz semptomları al
-    # Tüm semptomların uzun bir listesini almak için veri çerçevesini dönüştürüyoruz (melt)
-    melted = df.melt(id_vars=['Disease'], value_vars=symptom_cols).dropna()
-    unique_symptoms = sorted(melted['value'].unique())
+    # Tüm benzersiz semptomları al (temizlenmiş: boşluklar kırpılmış, '_' -> ' ')
+    records = df[symptom_cols].values
+    encoder = SymptomEncoder.from_records(records)
+    unique_symptoms = encoder.symptoms
     
     print(f"Found {len(unique_symptoms)} unique symptoms.")
     
-    # İkili bir matris oluştur
-    # Sıfırlarla dolu bir veri çerçevesi başlat
-    X = pd.DataFrame(0, index=df.index, columns=unique_symptoms)
-    
-    # Matrisi doldur
-    for col in symptom_cols:
-        # Her semptom sütunu için, X'teki karşılık gelen semptom sütununu 1 yap
-        for idx, row in df.iterrows():
-            symptoms = row[symptom_cols].values
-            # NaN ve None değerlerini filtrele
-            valid_symptoms = [s for s in symptoms if pd.notna(s)]
-            X.loc[idx, valid_symptoms] = 1
+    # Tek geçişte seyrek ikili matris oluştur (API ile aynı kodlayıcı)
+    X = encoder.transform_records(records)
 
-    y = df['Disease']
+    return X, df['Disease'], unique_symptoms
+
+def compare_full_fit(clf, X, y, dedupe_fit_time):
+    # Aynı yapılandırmayı tekilleştirilmemiş eğitim bölmesinde eğitip süre kazancını ölç (yalnızca rapor için)
+    from sklearn.base import clone
+
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    full = clone(clf).set_params(warm_start=False)
+    start = time.perf_counter()
+    full.fit(X_train, y_train)
+    full_fit_time = time.perf_counter() - start
+    print(f"Fit time: {full_fit_time:.2f}s on all {X_train.shape[0]} rows vs {dedupe_fit_time:.2f}s deduplicated "
+          f"({full_fit_time / max(dedupe_fit_time, 1e-9):.1f}x faster, {full_fit_time - dedupe_fit_time:.2f}s saved)")
+
+def train_model(n_jobs=-1, search=False, param_grid=None, warm_start=0, data_path=None, dedupe=False, compare_full=False):
+    print("Loading dataset...")
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    data_path = data_path or os.path.join(base_dir, 'data', 'dataset.csv')
     
-    # 2. Modeli Eğit
-    print("Training RandomForest Classifier...")
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    if not os.path.exists(data_path):
+        print(f"Error: {data_path} not found.")
+        return
+
+    X, y, unique_symptoms = load_dataset(data_path)
     
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X_train, y_train)
+    # Hastalık × semptom frekans matrisi (tekilleştirmeden önce, tüm satırlarla): /predict/next-symptom için
+    severity_path = os.path.join(base_dir, 'data', 'Symptom-severity.csv')
+    severity = load_severity(severity_path, unique_symptoms) if os.path.exists(severity_path) else None
+    guidance = DiseaseSymptomMatrix.from_training(X, y, unique_symptoms, severity)
     
-    y_pred = clf.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    print(f"Model Accuracy: {accuracy * 100:.2f}%")
+    # 2. Modeli Eğit
+    if dedupe:
+        # Bölmeden önce tekilleştir: aynı satır hem eğitim hem test kümesine düşemez
+        n_rows = X.shape[0]
+        X_full, y_full = X, y
+        X, y, weights = deduplicate(X, y)
+        print(f"Deduplicated {n_rows} rows into {X.shape[0]} unique rows ({n_rows / max(X.shape[0], 1):.1f}x compression).")
+        X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(X, y, weights, test_size=0.2, random_state=42)
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        w_train = w_test = None
     
-    # 3. Modeli ve Meta Verileri Kaydet
     models_dir = os.path.join(base_dir, 'models')
     os.makedirs(models_dir, exist_ok=True)
     
     model_path = os.path.join(models_dir, 'disease_model.joblib')
     symptoms_path = os.path.join(models_dir, 'symptoms_list.joblib')
+    forest_path = os.path.join(models_dir, 'disease_forest.joblib')
+    guidance_path = os.path.join(models_dir, 'disease_symptom_matrix.npz')
+    
+    if warm_start:
+        # Mevcut ormanı yeniden eğitmeden yeni ağaçlar ekle
+        print(f"Adding {warm_start} trees to existing model (warm start)...")
+        clf = joblib.load(model_path)
+        if list(joblib.load(symptoms_path)) != list(unique_symptoms):
+            print("Error: dataset symptoms do not match the existing model; run a full training instead.")
+            return
+        clf.set_params(warm_start=True, n_estimators=len(clf.estimators_) + warm_start, n_jobs=n_jobs)
+        clf, fit_time = fit_forest(clf, X_train, y_train, X_test, y_test, w_train, w_test)
+    elif search:
+        print("Searching RandomForest hyperparameters...")
+        best_params = search_forest(X_train, y_train, param_grid or DEFAULT_PARAM_GRID, n_jobs, sample_weight=w_train)
+        clf = RandomForestClassifier(**best_params, random_state=42, n_jobs=n_jobs)
+        clf, fit_time = fit_forest(clf, X_train, y_train, X_test, y_test, w_train, w_test)
+    else:
+        print("Training RandomForest Classifier...")
+        clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs)
+        clf, fit_time = fit_forest(clf, X_train, y_train, X_test, y_test, w_train, w_test)
+    
+    if compare_full:
+        if dedupe and not warm_start:
+            compare_full_fit(clf, X_full, y_full, fit_time)
+        else:
+            # Sıcak başlatmada yalnızca yeni ağaçlar eğitilir; tam eğitimle karşılaştırma anlamlı değil
+            print("--compare-full needs --dedupe and a full (non warm-start) fit; skipped.")
+    
+    # API tek satırlık tahminlerde iş parçacığı havuzu yükü taşımasın
+    clf.set_params(n_jobs=None, warm_start=False)
     
+    # 3. Modeli ve Meta Verileri Kaydet
     joblib.dump(clf, model_path)
     joblib.dump(unique_symptoms, symptoms_path)
     
+    # Hızlı çıkarım için ağaçları düz dizilere dönüştür (MEDIMIND_INFERENCE_ENGINE=flat)
+    flatten_forest(clf, unique_symptoms).save(forest_path)
+    guidance.save(guidance_path)
+    
     print(f"Model saved to {model_path}")
     print(f"Symptoms list saved to {symptoms_path}")
+    print(f"Flat forest saved to {forest_path}")
+    print(f"Disease-symptom matrix saved to {guidance_path}")
+
+def _parse_grid_values(text, cast):
+    return [None if v.strip().lower() == "none" else cast(v) for v in text.split(",")]
+
+def _max_features(value):
+    value = value.strip()
+    try:
+        return float(value) if "." in value else int(value)
+    except ValueError:
+        return value
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the MediMind disease prediction model.")
+    parser.add_argument("--data", help="dataset.csv or a sparse .npz from preprocess.py --format npz (default: data/dataset.csv)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="CPU cores for fitting and search (-1 = all cores)")
+    parser.add_argument("--search", action="store_true", help="cross-validated hyperparameter search before the final fit")
+    parser.add_argument("--n-estimators", help="comma separated search values, e.g. 50,100,200")
+    parser.add_argument("--max-depth", help="comma separated search values, e.g. none,20,40")
+    parser.add_argument("--max-features", help="comma separated search values, e.g. sqrt,log2,0.3")
+    parser.add_argument("--dedupe", action="store_true", help="collapse duplicate (disease, symptom set) rows into weighted unique rows before the split")
+    parser.add_argument("--compare-full", action="store_true", help="with --dedupe, also time the same fit on all rows and report the fit-time savings")
+    parser.add_argument("--warm-start", type=int, default=0, metavar="N", help="add N trees to the existing disease_model.joblib")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    train_model()
+    args = parse_args()
+    param_grid = dict(DEFAULT_PARAM_GRID)
+    if args.n_estimators:
+        param_grid["n_estimators"] = _parse_grid_values(args.n_estimators, int)
+    if args.max_depth:
+        param_grid["max_depth"] = _parse_grid_values(args.max_depth, int)
+    if args.max_features:
+        param_grid["max_features"] = _parse_grid_values(args.max_features, _max_features)
+    train_model(n_jobs=args.n_jobs, search=args.search, param_grid=param_grid, warm_start=args.warm_start, data_path=args.data, dedupe=args.dedupe, compare_full=args.compare_full)
@@ -1,115 +1,265 @@
 import pandas as pd
+import argparse
 import json
 import os
+import threading
 import time
-from googletrans import Translator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def translate_assets():
-    translator = Translator()
+class TranslationCache:
+    # Kaynak metin -> çeviri eşlemesi; çalıştırmalar arasında diskte (JSON) kalıcıdır.
+    # Periyodik kaydetme kontrol noktası görevi görür: yarıda kesilen bir çalıştırma kaldığı yerden devam eder.
+    # Önbellek bir arka uç ve dil çiftine aittir (ör. google en->tr); farklı bir arka ucun dosyası kullanılmaz.
+    def __init__(self, path=None, key=None):
+        self.path = path
+        self.key = dict(key or {})
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data.get("entries"), dict):
+                # Anahtarsız eski biçim: hangi arka uçla üretildiği bilinmez (identity çıktısı olabilir), yeniden çevrilir
+                print(f"Ignoring {path}: cache has no backend/language key.")
+            elif data.get("key") != self.key:
+                raise ValueError(f"{path} belongs to {data.get('key')}, not {self.key}; use a different --cache file.")
+            else:
+                self._entries = data["entries"]
+                print(f"Loaded {len(self._entries)} cached translations from {path}")
+
+    def __contains__(self, text):
+        return text in self._entries
+
+    def get(self, text):
+        return self._entries.get(text)
+
+    def put(self, text, translation):
+        with self._lock:
+            self._entries[text] = translation
+            self._dirty = True
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            # Yarım yazılmış dosya bırakmamak için önce geçici dosyaya yaz
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"key": self.key, "entries": self._entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+class GoogleTranslateBackend:
+    # googletrans tabanlı çevirici; her iş parçacığı kendi Translator örneğini kullanır
+    name = "google"
+    stub = False
+
+    def __init__(self, src='en', dest='tr'):
+        from googletrans import Translator
+
+        self._translator_cls = Translator
+        self._local = threading.local()
+        self.src = src
+        self.dest = dest
+
+    def __call__(self, text):
+        translator = getattr(self._local, 'translator', None)
+        if translator is None:
+            translator = self._local.translator = self._translator_cls()
+        return translator.translate(text, src=self.src, dest=self.dest).text
+
+class IdentityBackend:
+    # Ağ erişimi olmadan denemeler ve testler için metni aynen döndüren yerel yedek.
+    # stub: çıktısı gerçek çeviri değildir; varsayılan olarak data/ altındaki varlıklar yazılmaz
+    name = "identity"
+    stub = True
+
+    def __init__(self, src='en', dest='tr'):
+        self.src = src
+        self.dest = dest
+
+    def __call__(self, text):
+        return text
+
+BACKENDS = {
+    "google": GoogleTranslateBackend,
+    "identity": IdentityBackend,
+}
+
+def translate_texts(texts, backend, cache, max_workers=8, retries=3, checkpoint_every=50):
+    # Metinleri tekilleştir, önbellekte olmayanları sınırlı eşzamanlılıkla çevir.
+    # Dönen sözlük her kaynak metni çevirisine eşler (çevrilemeyenler kaynak metinle kalır).
+    unique_texts = list(dict.fromkeys(t for t in texts if isinstance(t, str) and t.strip() != ""))
+    pending = [t for t in unique_texts if t not in cache]
+    print(f"{len(unique_texts)} unique texts, {len(unique_texts) - len(pending)} cached, {len(pending)} to translate")
+
+    def translate_one(text):
+        # Sabit bekleme yerine yalnızca hata durumunda üstel geri çekilme
+        for attempt in range(retries):
+            try:
+                return backend(text)
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                delay = 0.5 * (2 ** attempt)
+                print(f"Retrying '{text[:40]}' in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    failed = 0
+    if pending:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        try:
+            futures = {executor.submit(translate_one, text): text for text in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                text = futures[future]
+                try:
+                    cache.put(text, future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"Error translating {text}: {e}")
+                if done % checkpoint_every == 0:
+                    cache.save()
+                    print(f"Translated {done}/{len(pending)}")
+        finally:
+            # Kesinti (Ctrl+C) olursa bekleyen işleri iptal et ve tamamlanan çevirileri kaydet
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            cache.save()
+
+    if failed:
+        print(f"Warning: {failed} texts could not be translated and were left in English (rerun to retry).")
+    return {text: cache.get(text) if text in cache else text for text in unique_texts}
+
+def translate_assets(backend=None, cache_path=None, max_workers=8, output_dir=None):
     # Yolu bu betiğe göre ayarla
     base_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(base_dir, 'data')
-    
+    backend = backend or GoogleTranslateBackend()
+    cache_key = {"backend": backend.name, "src": backend.src, "dest": backend.dest}
+    if cache_path is None:
+        cache_path = os.path.join(data_dir, f"translation_cache_{backend.name}_{backend.src}_{backend.dest}.json")
+    cache = TranslationCache(cache_path, cache_key)
+
+    # Çıktılar: gerçek arka uçlar data/ altındaki Türkçe varlıkları günceller; stub yalnızca --output-dir ile yazar
+    if output_dir is None and not backend.stub:
+        output_dir = data_dir
+    if output_dir is None:
+        print(f"Dry run with the '{backend.name}' backend: assets are not written (pass --output-dir to write them).")
+    else:
+        os.makedirs(output_dir, exist_ok=True)
+
     print("--- Starting Translation Process ---")
 
-    # 1. Semptom Açıklamalarını Çevir
     desc_path = os.path.join(data_dir, 'symptom_Description.csv')
+    prec_path = os.path.join(data_dir, 'symptom_precaution.csv')
+    dataset_path = os.path.join(data_dir, 'dataset.csv')
+    cols_to_translate = ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
+
+    # Tüm kaynak dosyalardaki metinleri topla; aynı metin (ör. "consult nearest hospital") bir kez çevrilir
+    texts = []
+    df_desc = df_prec = None
+    unique_symptoms = []
+
     if os.path.exists(desc_path):
-        print("Translating Descriptions...")
         df_desc = pd.read_csv(desc_path)
-        
-        # Güvenli çeviri için yardımcı fonksiyon
-        def safe_translate(text):
-            try:
-                time.sleep(0.2) # Hız sınırından kaçın
-                if not isinstance(text, str): return text
-                return translator.translate(text, src='en', dest='tr').text
-            except Exception as e:
-                print(f"Error translating {text}: {e}")
-                return text
+        texts.extend(df_desc['Description'])
+        texts.extend(d.strip() for d in df_desc['Disease'].unique())
 
-        df_desc['Description'] = df_desc['Description'].apply(safe_translate)
-        
-        output_desc = os.path.join(data_dir, 'symptom_Description_TR.csv')
-        df_desc.to_csv(output_desc, index=False)
-        print(f"Saved: {output_desc}")
-
-    # 2. Önlemleri Çevir
-    prec_path = os.path.join(data_dir, 'symptom_precaution.csv')
     if os.path.exists(prec_path):
-        print("Translating Precautions...")
         df_prec = pd.read_csv(prec_path)
-        
-        cols_to_translate = ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
-        
         for col in cols_to_translate:
-            print(f"Processing column: {col}")
             # Hataları önlemek için önce NaN'ları doldur
             df_prec[col] = df_prec[col].fillna("")
-            df_prec[col] = df_prec[col].apply(lambda x: safe_translate(x) if x != "" else "")
+            texts.extend(df_prec[col])
 
-        output_prec = os.path.join(data_dir, 'symptom_precaution_TR.csv')
-        df_prec.to_csv(output_prec, index=False)
-        print(f"Saved: {output_prec}")
-
-    # 3. Semptom Haritası Oluştur (İngilizce -> Türkçe)
-    dataset_path = os.path.join(data_dir, 'dataset.csv')
     if os.path.exists(dataset_path):
-        print("Creating Symptom Map...")
         df = pd.read_csv(dataset_path)
-        
+
         # Symptom_1'den Symptom_17'ye kadar olan sütunlardan tüm benzersiz semptomları al
         symptom_cols = [col for col in df.columns if 'Symptom' in col]
-        
-        # Anahtarları eşleştirmek için semptomları tam olarak model eğitiminde yapıldığı gibi temizlememiz gerekiyor
-        # train_model.py içinde: df[col] = df[col].str.strip().str.replace('_', ' ')
-        # Ancak burada haritanın *modelin* özellik adlarına göre anahtarlanmasını istiyoruz.
-        # Model özellikleri symptoms_list.joblib içinde saklanır, ancak bunları burada da türetebiliriz.
-        
-        # Önce sadece ham benzersiz değerleri alalım
+
+        # Haritanın *modelin* özellik adlarına göre anahtarlanması gerekiyor:
+        # train_model.py semptomları kırpar ve alt çizgiyi boşlukla değiştirir
         all_symptoms = pd.unique(df[symptom_cols].values.ravel())
         unique_symptoms = [str(s).strip() for s in all_symptoms if pd.notna(s)]
-        unique_symptoms = sorted(list(set(unique_symptoms))) 
-        
+        unique_symptoms = sorted(list(set(unique_symptoms)))
+        texts.extend(sym.replace('_', ' ') for sym in unique_symptoms)
+
+    translations = translate_texts(texts, backend, cache, max_workers=max_workers)
+
+    def translate(text):
+        if not isinstance(text, str):
+            return text
+        return translations.get(text, text)
+
+    if output_dir is None:
+        print("--- Translation Complete ---")
+        return
+
+    # 1. Semptom Açıklamalarını Çevir
+    if df_desc is not None:
+        print("Translating Descriptions...")
+        df_desc_tr = df_desc.copy()
+        df_desc_tr['Description'] = df_desc_tr['Description'].apply(translate)
+
+        output_desc = os.path.join(output_dir, 'symptom_Description_TR.csv')
+        df_desc_tr.to_csv(output_desc, index=False)
+        print(f"Saved: {output_desc}")
+
+    # 2. Önlemleri Çevir
+    if df_prec is not None:
+        print("Translating Precautions...")
+        for col in cols_to_translate:
+            df_prec[col] = df_prec[col].apply(lambda x: translate(x) if x != "" else "")
+
+        output_prec = os.path.join(output_dir, 'symptom_precaution_TR.csv')
+        df_prec.to_csv(output_prec, index=False)
+        print(f"Saved: {output_prec}")
+
+    # 3. Semptom Haritası Oluştur (İngilizce -> Türkçe)
+    if unique_symptoms:
+        print("Creating Symptom Map...")
         symptom_map = {}
-        
-        print(f"Translating {len(unique_symptoms)} unique symptoms...")
         for sym in unique_symptoms:
             # Model alt çizgi yerine boşluk kullanıyor
             model_key = sym.replace('_', ' ')
-            
-            # Translate
-            tr_text = safe_translate(model_key)
-            
+
             # Daha iyi kullanıcı arayüzü için baş harfleri büyüt
-            symptom_map[model_key] = tr_text.title()
-            
-        map_path = os.path.join(data_dir, 'symptoms_tr_map.json')
+            symptom_map[model_key] = translate(model_key).title()
+
+        map_path = os.path.join(output_dir, 'symptoms_tr_map.json')
         with open(map_path, 'w', encoding='utf-8') as f:
             json.dump(symptom_map, f, ensure_ascii=False, indent=4)
         print(f"Saved: {map_path}")
 
     # 4. Hastalık Haritası Oluştur (İngilizce -> Türkçe)
-    if os.path.exists(desc_path):
+    if df_desc is not None:
         print("Creating Disease Map...")
-        # Daha önce yüklediğimiz açıklama veri çerçevesini kullanabilir veya yeniden yükleyebiliriz
-        df_desc = pd.read_csv(desc_path)
-        unique_diseases = df_desc['Disease'].unique()
-        
         disease_map = {}
-        print(f"Translating {len(unique_diseases)} diseases...")
-        
-        for disease in unique_diseases:
+        for disease in df_desc['Disease'].unique():
             disease = disease.strip()
-            tr_text = safe_translate(disease)
-            disease_map[disease] = tr_text.title()
-            
-        disease_map_path = os.path.join(data_dir, 'diseases_tr_map.json')
+            disease_map[disease] = translate(disease).title()
+
+        disease_map_path = os.path.join(output_dir, 'diseases_tr_map.json')
         with open(disease_map_path, 'w', encoding='utf-8') as f:
             json.dump(disease_map, f, ensure_ascii=False, indent=4)
         print(f"Saved: {disease_map_path}")
 
     print("--- Translation Complete ---")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Translate MediMind assets from English to Turkish.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="google", help="translation backend (identity = offline stub)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent translation requests")
+    parser.add_argument("--cache", help="translation cache file (default: data/translation_cache_<backend>_en_tr.json)")
+    parser.add_argument("--output-dir", help="where translated assets are written (default: data/; the identity stub writes nothing unless set)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    translate_assets()
+    args = parse_args()
+    translate_assets(backend=BACKENDS[args.backend](), cache_path=args.cache, max_workers=args.workers, output_dir=args.output_dir)